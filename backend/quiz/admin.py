@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Quiz, Question, Choice, QuizSubmission
+from .models import Quiz, Question, Choice, ChoiceStats, QuizSubmission
 
 admin.site.register(Quiz)
 admin.site.register(QuizSubmission)
 admin.site.register(Question)
-admin.site.register(Choice)
\ No newline at end of file
+admin.site.register(Choice)
+admin.site.register(ChoiceStats)
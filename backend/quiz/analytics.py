@@ -0,0 +1,132 @@
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from .models import Answer, Choice, ChoiceStats, Question, QuizSubmission
+
+
+def create_choice_stats(choices):
+    """Create the empty statistics of new choices, so answers only ever UPDATE them."""
+    ChoiceStats.objects.bulk_create([ChoiceStats(choice_id=choice.pk) for choice in choices])
+
+
+def count_choice_answers(choice_ids):
+    """Add newly written answers, given by their choice ids, to the choice statistics."""
+    by_total = defaultdict(list)
+    for choice_id, total in Counter(choice_ids).items():
+        by_total[total].append(choice_id)
+    for total, choices in by_total.items():
+        ChoiceStats.objects.filter(choice__in=choices).update(answer_count=F('answer_count') + total)
+
+
+def discount_choice_answers(choice_ids):
+    """Remove replaced answers, given by their choice ids, from the choice statistics."""
+    by_total = defaultdict(list)
+    for choice_id, total in Counter(choice_ids).items():
+        by_total[total].append(choice_id)
+    for total, choices in by_total.items():
+        ChoiceStats.objects.filter(choice__in=choices, answer_count__gte=total).update(answer_count=F('answer_count') - total)
+
+
+def discount_answered_choices(answers):
+    """Remove a queryset of answers, each to a different question, from the choice statistics in one UPDATE."""
+    ChoiceStats.objects.filter(choice__in=answers.values('choice'), answer_count__gt=0).update(answer_count=F('answer_count') - 1)
+
+
+def move_answered_choice(answers, choice_id):
+    """
+    Move one answer from the choice of `answers`, a queryset holding at most
+    one answer, to `choice_id` (which may be None) in the choice statistics
+    with one UPDATE.
+    """
+    previous = Q(choice__in=answers.values('choice'))
+    delta = Value(0) - Case(When(previous, then=Value(1)), default=Value(0))
+    rows = previous
+    if choice_id is not None:
+        delta = delta + Case(When(choice=choice_id, then=Value(1)), default=Value(0))
+        rows |= Q(choice=choice_id)
+    ChoiceStats.objects.filter(rows).update(answer_count=Greatest(F('answer_count') + delta, Value(0)))
+
+
+def rebuild_choice_stats(quiz_id=None, batch_size=1000):
+    """
+    Recompute the choice statistics of one quiz, or of every quiz, from the
+    answers in a single GROUP BY pass. Returns the number of choices counted.
+    """
+    choices = Choice.objects.all()
+    if quiz_id is not None:
+        choices = choices.filter(question__quiz=quiz_id)
+    counts = choices.order_by().annotate(total=Count('answer')).values_list('id', 'total')
+    with transaction.atomic():
+        ChoiceStats.objects.filter(choice__in=choices).delete()
+        stats = [ChoiceStats(choice_id=choice_id, answer_count=total) for choice_id, total in counts.iterator()]
+        ChoiceStats.objects.bulk_create(stats, batch_size=batch_size)
+    return len(stats)
+
+
+def essay_count(answers):
+    """Count of `answers` for essay questions, skipped for the others."""
+    total = Subquery(answers.annotate(total=Count('id')).values('total'), output_field=IntegerField())
+    return Case(When(type='essay', then=Coalesce(total, Value(0))), default=Value(None), output_field=IntegerField())
+
+
+def get_quiz_analytics(quiz_id):
+    """
+    Per-question answer counts, correct rate and choice distribution from the
+    choice statistics, plus the score histogram of the quiz. Reads one row per
+    choice and one per distinct score. Only the answers of essay questions,
+    which have no choices, are counted through the answer index.
+    """
+    essay_answers = Answer.objects.filter(question=OuterRef('pk')).order_by().values('question')
+    rows = (
+        Question.objects.filter(quiz=quiz_id)
+        .annotate(
+            essay_answer_count=essay_count(essay_answers),
+            essay_correct_count=essay_count(essay_answers.filter(is_correct=True)),
+        )
+        .order_by('id', 'choices__id')
+        .values_list(
+            'id', 'content', 'type', 'correct_choice', 'essay_answer_count', 'essay_correct_count',
+            'choices__id', 'choices__content', 'choices__stats__answer_count',
+        )
+    )
+    questions = {}
+    for question_id, content, question_type, correct_choice, essay_answer_count, essay_correct_count, choice_id, choice_content, answer_count in rows:
+        question = questions.get(question_id)
+        if question is None:
+            question = questions[question_id] = {
+                'id': question_id,
+                'content': content,
+                'type': question_type,
+                'answer_count': essay_answer_count or 0,
+                'correct_count': essay_correct_count or 0,
+                'correct_rate': None,
+                'choices': [],
+            }
+        if choice_id is None or question_type != 'mcq':
+            continue
+        answer_count = answer_count or 0
+        is_correct = choice_id == correct_choice
+        question['choices'].append({
+            'id': choice_id,
+            'content': choice_content,
+            'is_correct': is_correct,
+            'answer_count': answer_count,
+        })
+        question['answer_count'] += answer_count
+        if is_correct:
+            question['correct_count'] += answer_count
+    for question in questions.values():
+        if question['type'] == 'mcq' and question['answer_count']:
+            question['correct_rate'] = question['correct_count'] / question['answer_count']
+
+    histogram = (
+        QuizSubmission.objects.filter(quiz=quiz_id, score__isnull=False)
+        .order_by('score')
+        .values_list('score')
+        .annotate(submissions=Count('id'))
+    )
+    return {
+        'questions': list(questions.values()),
+        'score_histogram': [{'score': score, 'submissions': submissions} for score, submissions in histogram],
+    }
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+class UserCache:
+    """Bounded LRU of users, each dropped `ttl` seconds after it was loaded."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user):
+        with self.lock:
+            self.entries[user_id] = (user, time.monotonic() + self.ttl)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache(
+    maxsize=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` that keeps the users it loads in `user_cache`. Saving
+    or deleting a user invalidates its entry in this process; other processes
+    see the change once the entry expires.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(jwt_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        return user
+
+
+class TokenClaimsUser(TokenUser):
+    """The user described by the claims of `CustomTokenObtainPairSerializer`."""
+
+    @cached_property
+    def name(self):
+        return self.token.get('name', '')
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+
+class TokenClaimsAuthentication(JWTAuthentication):
+    """
+    Database-free authentication: `request.user` is a `TokenClaimsUser` built
+    from the verified token. Views using it must only rely on `request.user.id`
+    and the claims, never on a model instance.
+    """
+
+    def get_user(self, validated_token):
+        if jwt_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Token contained no recognizable user identification')
+        return TokenClaimsUser(validated_token)
+
+
+class ClaimsForReadsMixin:
+    """
+    View mixin authenticating safe methods with `TokenClaimsAuthentication`.
+    Writes go through the default authenticators, which load the user, so a
+    deleted or deactivated account cannot change anything.
+    """
+
+    def get_authenticators(self):
+        if self.request.method in SAFE_METHODS:
+            return [TokenClaimsAuthentication()]
+        return super().get_authenticators()
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.db.models import F
+from .models import Question, Quiz
+from .renderers import ORJSONRenderer
+
+QUESTIONS_SNAPSHOT_TIMEOUT = 60 * 60
+ANSWER_KEY_TIMEOUT = 60 * 60
+# Not versioned, so kept short in case another process misses the invalidation.
+QUIZ_DURATION_TIMEOUT = 60
+
+
+def bump_quiz_revision(**filters):
+    Quiz.objects.filter(**filters).update(revision=F('revision') + 1)
+
+
+def questions_snapshot_key(quiz_id, revision, media_type):
+    return f'quiz:{quiz_id}:questions:{revision}:{media_type}'
+
+
+def get_questions_snapshot(quiz_id, revision, renderer=None):
+    """
+    Participant-facing question list of a quiz, without the correct choices,
+    rendered to bytes once per revision and media type. It is loaded with a
+    single query on a cache miss. Keys are versioned, so a bumped revision is
+    enough to stop serving a stale snapshot.
+    """
+    renderer = renderer or ORJSONRenderer()
+    key = questions_snapshot_key(quiz_id, revision, renderer.media_type)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        questions = {}
+        rows = Question.objects.filter(quiz=quiz_id).order_by('id', 'choices__id').values_list(
+            'id', 'content', 'type', 'quiz', 'choices__id', 'choices__content',
+        )
+        for question_id, content, question_type, quiz, choice_id, choice_content in rows:
+            question = questions.setdefault(question_id, {
+                'id': question_id,
+                'choices': [],
+                'content': content,
+                'type': question_type,
+                'quiz': quiz,
+            })
+            if choice_id is not None:
+                question['choices'].append({'id': choice_id, 'content': choice_content})
+        snapshot = renderer.render({'revision': revision, 'questions': list(questions.values())})
+        cache.set(key, snapshot, QUESTIONS_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def answer_key_cache_key(quiz_id, revision):
+    return f'quiz:{quiz_id}:answer-key:{revision}'
+
+
+def get_answer_key(quiz_id, revision):
+    """
+    Map of question id to its type, correct choice and valid choice ids for a
+    quiz revision, loaded with a single query on a cache miss.
+    """
+    key = answer_key_cache_key(quiz_id, revision)
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = {}
+        rows = Question.objects.filter(quiz=quiz_id).values_list('id', 'type', 'correct_choice_id', 'choices__id')
+        for question_id, question_type, correct_choice_id, choice_id in rows:
+            entry = answer_key.setdefault(question_id, {
+                'type': question_type,
+                'correct_choice': correct_choice_id,
+                'choices': set(),
+            })
+            if choice_id is not None:
+                entry['choices'].add(choice_id)
+        cache.set(key, answer_key, ANSWER_KEY_TIMEOUT)
+    return answer_key
+
+
+def quiz_duration_key(quiz_id):
+    return f'quiz:{quiz_id}:duration'
+
+
+def get_quiz_duration(quiz_id):
+    """Duration of a quiz, read from the cache when possible. Returns None for unknown quizzes."""
+    key = quiz_duration_key(quiz_id)
+    cached = cache.get(key)
+    if cached is None:
+        row = Quiz.objects.filter(pk=quiz_id).values_list('duration').first()
+        if row is None:
+            return None
+        cached = row
+        cache.set(key, cached, QUIZ_DURATION_TIMEOUT)
+    return cached[0]
+
+
+def invalidate_quiz_duration(quiz_id):
+    cache.delete(quiz_duration_key(quiz_id))
@@ -4,6 +4,7 @@ question_type = [
 ]
 quiz_state = [
     ("not_started", "Not Started"),
+    ("in_progress", "In Progress"),
     ("expired", "Expired"),
     ("completed", "Completed"),
     ("pending_review", "Pending Review"),
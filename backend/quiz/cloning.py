@@ -0,0 +1,38 @@
+from django.db import transaction
+from .importer import save_batch
+from .models import Question, Quiz
+
+
+def clone_quiz(quiz, creator_id, **overrides):
+    """
+    Copy a quiz with its questions and choices for `creator_id`. The source
+    is read with one query and written with bulk inserts, so the number of
+    queries does not depend on the size of the quiz. Fields in `overrides`
+    replace the copied ones. Returns the new quiz and the number of
+    questions and choices copied.
+    """
+    rows = Question.objects.filter(quiz=quiz.pk).order_by('id', 'choices__id').values_list(
+        'id', 'content', 'type', 'correct_choice', 'choices__id', 'choices__content',
+    )
+    items = {}
+    for question_id, content, question_type, correct_choice, choice_id, choice_content in rows:
+        item = items.setdefault(question_id, {'content': content, 'type': question_type, 'choices': [], 'correct_choice': None})
+        if choice_id is None:
+            continue
+        # The correct choice is remapped by its position among the choices.
+        if choice_id == correct_choice:
+            item['correct_choice'] = len(item['choices'])
+        item['choices'].append(choice_content)
+
+    fields = {
+        'title': quiz.title,
+        'description': quiz.description,
+        'password': quiz.password,
+        'start_time': quiz.start_time,
+        'duration': quiz.duration,
+        **overrides,
+    }
+    with transaction.atomic():
+        clone = Quiz.objects.create(creator_id=creator_id, **fields)
+        questions, choices = save_batch(clone.pk, list(items.values())) if items else (0, 0)
+    return clone, questions, choices
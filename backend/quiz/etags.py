@@ -0,0 +1,33 @@
+import hashlib
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+
+def quiz_etag(quiz_id, revision, representation, media_type='application/json'):
+    """
+    Strong ETag of one representation of a quiz revision. The media type is
+    part of it, since each renderer produces different bytes.
+    """
+    key = f'{quiz_id}:{revision}:{representation}:{media_type}'
+    return '"%s"' % hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def is_not_modified(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison.
+    etags = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+    return '*' in etags or etag in etags
+
+
+def with_etag(response, etag):
+    response['ETag'] = etag
+    # Private to the user, and revalidated before every reuse.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(etag):
+    return with_etag(HttpResponseNotModified(), etag)
@@ -0,0 +1,87 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.functions import Coalesce
+from .models import Answer, Question, QuizSubmission
+
+EXPORT_CHUNK_SIZE = 2000
+SUBMISSION_COLUMNS = ['submission', 'email', 'name', 'state', 'score', 'started_at', 'finished_at', 'time_spent']
+
+
+class Echo:
+    """File-like object handing back what `csv.writer` writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_gradebook(quiz_id):
+    """
+    Yield `(submission, answers)` for every submission of a quiz, where
+    `answers` maps question ids to `(answer, is_correct)`, the answer being
+    the chosen choice or the essay text. Submissions and answers are read by
+    two chunked queries in the same order and merged as they stream, so
+    memory does not grow with the number of submissions.
+    """
+    submissions = (
+        QuizSubmission.objects.filter(quiz=quiz_id)
+        .order_by('id')
+        .values_list('id', 'user__email', 'user__name', 'state', 'score', 'started_at', 'finished_at', 'time_spent')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    answers = (
+        Answer.objects.filter(submission__quiz=quiz_id)
+        .annotate(content=Coalesce('choice__content', 'text'))
+        .order_by('submission', 'question')
+        .values_list('submission', 'question', 'content', 'is_correct')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    answer = next(answers, None)
+    for submission in submissions:
+        submission_answers = {}
+        while answer is not None and answer[0] <= submission[0]:
+            if answer[0] == submission[0]:
+                submission_answers[answer[1]] = answer[2:]
+            answer = next(answers, None)
+        yield submission, submission_answers
+
+
+def export_csv(quiz_id, rows_per_chunk=500):
+    """CSV gradebook: one row per submission and one column per question."""
+    questions = list(Question.objects.filter(quiz=quiz_id).order_by('id').values_list('id', 'content'))
+    writer = csv.writer(Echo())
+    yield writer.writerow(SUBMISSION_COLUMNS + [f'{number}. {content}' for number, (_, content) in enumerate(questions, 1)])
+
+    rows = []
+    for submission, answers in iter_gradebook(quiz_id):
+        rows.append(writer.writerow(
+            list(submission) + [answers[question_id][0] if question_id in answers else '' for question_id, _ in questions]
+        ))
+        if len(rows) == rows_per_chunk:
+            yield ''.join(rows)
+            rows = []
+    if rows:
+        yield ''.join(rows)
+
+
+def export_ndjson(quiz_id, rows_per_chunk=500):
+    """NDJSON gradebook: one object per submission with its answers keyed by question id."""
+    rows = []
+    for submission, answers in iter_gradebook(quiz_id):
+        row = dict(zip(SUBMISSION_COLUMNS, submission))
+        row['answers'] = {
+            question_id: {'answer': answer, 'is_correct': is_correct}
+            for question_id, (answer, is_correct) in answers.items()
+        }
+        rows.append(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+        if len(rows) == rows_per_chunk:
+            yield ''.join(rows)
+            rows = []
+    if rows:
+        yield ''.join(rows)
+
+
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+}
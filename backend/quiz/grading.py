@@ -0,0 +1,162 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, Exists, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from .analytics import discount_choice_answers, move_answered_choice
+from .models import Answer, Choice, Question, QuizSubmission
+
+
+def is_correct_answer(entry, choice_id):
+    """Grade one answer against an answer key entry from `get_answer_key`."""
+    return entry['type'] == 'mcq' and choice_id == entry['correct_choice']
+
+
+def build_answer(submission_id, question_id, entry, choice=None, text=''):
+    """An unsaved answer graded against its answer key entry. Essays are left ungraded for review."""
+    if entry['type'] == 'essay':
+        return Answer(submission_id=submission_id, question_id=question_id, text=text, needs_review=True)
+    return Answer(submission_id=submission_id, question_id=question_id, choice_id=choice, is_correct=is_correct_answer(entry, choice))
+
+
+def upsert_answer(answer):
+    """
+    Store `answer`, replacing the stored answer to the same question, and move
+    the submission counters and choice statistics by the difference. Nothing
+    is read first: each statement computes its delta from the stored answer.
+    The counter UPDATE comes first, skips an unchanged answer and holds the
+    submission's row lock for the rest of the transaction. One UPDATE then
+    moves the answer between choice statistics, and the answer is written
+    with one INSERT ... ON CONFLICT UPDATE. That is one statement per table:
+    the backends Django supports cannot write several tables in one
+    statement, and a trigger doing it would live outside the ORM. Returns
+    whether anything was written. Call it inside a transaction.
+    """
+    stored = Answer.objects.filter(submission=answer.submission_id, question=answer.question_id)
+    stored_for_submission = Answer.objects.filter(submission=OuterRef('pk'), question=answer.question_id)
+    answered = Case(When(Exists(stored_for_submission), then=Value(0)), default=Value(1))
+    correct = Value(int(answer.is_correct is True)) - Case(
+        When(Exists(stored_for_submission.filter(is_correct=True)), then=Value(1)), default=Value(0),
+    )
+    written = (
+        QuizSubmission.objects.filter(pk=answer.submission_id)
+        .exclude(Exists(stored_for_submission.filter(choice=answer.choice_id, text=answer.text)))
+        .update(
+            answered_count=F('answered_count') + answered,
+            correct_count=F('correct_count') + correct,
+            score=Coalesce('score', Value(0), output_field=DecimalField()) + correct,
+        )
+    )
+    if not written:
+        return False
+
+    move_answered_choice(stored, answer.choice_id)
+    Answer.objects.bulk_create(
+        [answer],
+        update_conflicts=True,
+        unique_fields=['submission', 'question'],
+        update_fields=['choice', 'text', 'is_correct', 'needs_review', 'review_lease', 'review_lease_expires'],
+    )
+    return True
+
+
+def record_answers(submission_id, answered, correct):
+    """Bump the progress counters and running score of a submission in one UPDATE."""
+    return QuizSubmission.objects.filter(pk=submission_id).update(
+        answered_count=F('answered_count') + answered,
+        correct_count=F('correct_count') + correct,
+        score=Coalesce('score', Value(0), output_field=DecimalField()) + correct,
+    )
+
+
+def mark_answers(answers):
+    """
+    Recompute `is_correct` for a queryset of answers against the current
+    answer keys. MCQ answers are graded in one UPDATE and leave the review
+    queue. Answers given with a choice to a question that is no longer an MCQ
+    keep the choice as their text and go back to review.
+    """
+    correct = Question.objects.filter(pk=OuterRef('question'), type='mcq', correct_choice=OuterRef('choice'))
+    marked = answers.filter(question__type='mcq').update(
+        is_correct=Exists(correct),
+        needs_review=False,
+        review_lease=None,
+        review_lease_expires=None,
+    )
+
+    chosen = answers.exclude(question__type='mcq').filter(choice__isnull=False)
+    counts = dict(chosen.order_by().values_list('choice').annotate(total=Count('id')))
+    if counts:
+        discount_choice_answers(Counter(counts).elements())
+        marked += chosen.update(
+            text=Subquery(Choice.objects.filter(pk=OuterRef('choice')).values('content')[:1]),
+            choice=None,
+            is_correct=None,
+            needs_review=True,
+        )
+    return marked
+
+
+def settle_review_states(submissions):
+    """
+    Move finished submissions with answers waiting for review to
+    `pending_review`, and those left without any to `reviewed`.
+    """
+    pending = Exists(Answer.objects.filter(submission=OuterRef('pk'), needs_review=True))
+    submissions.filter(pending, state__in=['expired', 'completed', 'reviewed']).update(state='pending_review')
+    submissions.filter(state='pending_review').exclude(pending).update(state='reviewed')
+
+
+def count_answers(**filters):
+    """Correlated subquery counting the answers of the outer submission."""
+    answers = (
+        Answer.objects.filter(submission=OuterRef('pk'), **filters)
+        .order_by()
+        .values('submission')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(answers, output_field=IntegerField()), Value(0))
+
+
+def rescore(submissions):
+    """
+    Write the number of correct answers into `correct_count` and `score` for
+    every submission in one UPDATE.
+    """
+    correct_count = count_answers(is_correct=True)
+    return submissions.update(correct_count=correct_count, score=correct_count)
+
+
+def recount(submissions):
+    """Recompute the progress counters and score of every submission from its stored answers in one UPDATE."""
+    correct_count = count_answers(is_correct=True)
+    return submissions.update(answered_count=count_answers(), correct_count=correct_count, score=correct_count)
+
+
+def keep_score_before_regrade(submissions):
+    # Only the first regrade records the original score.
+    submissions.filter(score__isnull=False, score_before_regrade__isnull=True).update(score_before_regrade=F('score'))
+
+
+def grade_quiz(quiz_id, regrade=False):
+    """
+    Grade every submission of a quiz with set-based SQL. With `regrade`, the
+    current scores are kept in `score_before_regrade` first.
+    """
+    submissions = QuizSubmission.objects.filter(quiz=quiz_id)
+    with transaction.atomic():
+        if regrade:
+            keep_score_before_regrade(submissions)
+        mark_answers(Answer.objects.filter(question__quiz=quiz_id))
+        settle_review_states(submissions)
+        return rescore(submissions)
+
+
+def regrade_question(question):
+    """Rescore only the submissions that answered `question` after its answer key changed."""
+    submissions = QuizSubmission.objects.filter(pk__in=Answer.objects.filter(question=question).values('submission'))
+    with transaction.atomic():
+        keep_score_before_regrade(submissions)
+        mark_answers(Answer.objects.filter(question=question))
+        settle_review_states(submissions)
+        return rescore(submissions)
@@ -0,0 +1,69 @@
+import functools
+import hashlib
+import orjson
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_CACHE = 'idempotency'
+MAX_KEY_LENGTH = 255
+# How long a key stays reserved by a request that never finishes.
+IN_FLIGHT_TIMEOUT = 60
+
+
+def idempotency_cache_key(request, key):
+    digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+    return f'idempotency:{request.user.id}:{digest}'
+
+
+def request_fingerprint(request):
+    body = orjson.dumps(request.data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.md5(request.method.encode() + request.path.encode() + body, usedforsecurity=False).digest()
+
+
+def idempotent(handler):
+    """
+    Let a view method be retried safely with an `Idempotency-Key` header. The
+    first request reserves its key in the `idempotency` cache, which bounds
+    and expires the keys, and its response then replaces the reservation. A
+    retry gets that response back before the view runs a single query, or a
+    409 while the first request is still running. Reusing a key for a
+    different request is refused.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return handler(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response({'error': f'The Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters long.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        store = caches[IDEMPOTENCY_CACHE]
+        cache_key = idempotency_cache_key(request, key)
+        fingerprint = request_fingerprint(request)
+        if not store.add(cache_key, (fingerprint, None, None), timeout=IN_FLIGHT_TIMEOUT):
+            stored = store.get(cache_key)
+            if stored is not None:
+                stored_fingerprint, status_code, data = stored
+                if stored_fingerprint != fingerprint:
+                    return Response({'error': 'The Idempotency-Key was already used for a different request.'}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                if status_code is None:
+                    return Response({'error': 'A request with this Idempotency-Key is still in progress.'}, status=status.HTTP_409_CONFLICT)
+                response = Response(data, status=status_code)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+            # The entry expired in between: this request takes the key.
+            store.set(cache_key, (fingerprint, None, None), timeout=IN_FLIGHT_TIMEOUT)
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except Exception:
+            store.delete(cache_key)
+            raise
+        # Server errors are not final; the retry runs the request again.
+        if response.status_code < 500:
+            store.set(cache_key, (fingerprint, response.status_code, response.data))
+        else:
+            store.delete(cache_key)
+        return response
+    return wrapper
@@ -0,0 +1,219 @@
+import codecs
+import csv
+import json
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+from .analytics import create_choice_stats
+from .cache import bump_quiz_revision
+from .models import Choice, Question
+from .serializers import QuestionImportSerializer
+
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ERRORS = 20
+MAX_ITEM_SIZE = 1024 * 1024
+JSON_WHITESPACE = ' \t\n\r'
+
+
+class QuizImportError(Exception):
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def read_chunks(stream, size=64 * 1024):
+    """Decode a binary stream as UTF-8 text, one chunk at a time."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    while True:
+        data = stream.read(size)
+        try:
+            text = decoder.decode(data or b'', final=not data)
+        except UnicodeDecodeError:
+            raise QuizImportError('The input is not valid UTF-8.')
+        if text:
+            yield text
+        if not data:
+            return
+
+
+def iter_json(chunks):
+    """
+    Yield the items of a JSON array, or of newline-delimited JSON, holding
+    no more than one item and one chunk in memory.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buffer, position = '', 0
+    array = None
+    expect_separator = False
+
+    while True:
+        while position < len(buffer) and buffer[position] in JSON_WHITESPACE:
+            position += 1
+        if position == len(buffer):
+            chunk = next(chunks, None)
+            if chunk is None:
+                if array:
+                    raise QuizImportError('The JSON array is not closed.')
+                return
+            buffer, position = chunk, 0
+            continue
+
+        char = buffer[position]
+        if array is None:
+            array = char == '['
+            if array:
+                position += 1
+            continue
+        if array and char == ']':
+            return
+        if array and expect_separator:
+            if char != ',':
+                raise QuizImportError(f'Expected "," or "]" in the JSON array, found {char!r}.')
+            position += 1
+            expect_separator = False
+            continue
+
+        while True:
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+                break
+            except json.JSONDecodeError as error:
+                # The item may continue in the next chunk.
+                chunk = next(chunks, None)
+                if chunk is None or len(buffer) - position > MAX_ITEM_SIZE:
+                    raise QuizImportError(f'Invalid JSON: {error.msg}.')
+                buffer, position = buffer[position:] + chunk, 0
+        yield item
+        expect_separator = True
+
+
+def iter_lines(chunks):
+    pending = ''
+    for chunk in chunks:
+        lines = (pending + chunk).splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_csv(chunks):
+    """
+    Yield question items from CSV rows with a `content`, `type` and
+    `correct_choice` column and any number of `choice` columns.
+    """
+    reader = csv.reader(iter_lines(chunks))
+    try:
+        header = [column.strip().lower() for column in next(reader)]
+    except StopIteration:
+        return
+    except csv.Error as error:
+        raise QuizImportError(f'Invalid CSV: {error}.')
+    if 'content' not in header:
+        raise QuizImportError('The CSV header has no "content" column.')
+    choice_columns = [index for index, column in enumerate(header) if column == 'choice']
+
+    try:
+        for row in reader:
+            if not any(row):
+                continue
+            values = dict(zip(header, row))
+            item = {
+                'content': values.get('content', ''),
+                'choices': [row[index] for index in choice_columns if index < len(row) and row[index]],
+            }
+            if values.get('type'):
+                item['type'] = values['type']
+            if values.get('correct_choice'):
+                item['correct_choice'] = values['correct_choice']
+            yield item
+    except csv.Error as error:
+        raise QuizImportError(f'Invalid CSV on line {reader.line_num}: {error}.')
+
+
+IMPORT_FORMATS = {
+    'application/json': iter_json,
+    'application/x-ndjson': iter_json,
+    'text/csv': iter_csv,
+}
+
+
+def nth_choice():
+    """
+    Subquery of the choice of the outer question whose position among its
+    choices, by id, is the number held in the question's `correct_choice_id`.
+    """
+    preceding = (
+        Choice.objects.filter(question=OuterRef('question'), id__lt=OuterRef('id'))
+        .order_by()
+        .values('question')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Subquery(
+        Choice.objects.filter(question=OuterRef('pk'))
+        .annotate(position=Coalesce(Subquery(preceding, output_field=IntegerField()), Value(0)))
+        .filter(position=OuterRef('correct_choice_id'))
+        .values('id')[:1]
+    )
+
+
+def save_batch(quiz_id, batch):
+    # A question can only point at its correct choice once the choice exists.
+    # Until then `correct_choice_id` holds the position of the choice, which
+    # the deferred foreign key check allows inside the transaction, and one
+    # UPDATE turns every position into the id of the inserted choice.
+    questions = Question.objects.bulk_create([
+        Question(quiz_id=quiz_id, content=item['content'], type=item['type'], correct_choice_id=item.get('correct_choice'))
+        for item in batch
+    ])
+    choices = Choice.objects.bulk_create([
+        Choice(question=question, content=content)
+        for question, item in zip(questions, batch)
+        for content in item['choices']
+    ])
+    create_choice_stats(choices)
+    linked = [question.pk for question in questions if question.correct_choice_id is not None]
+    if linked:
+        Question.objects.filter(pk__in=linked).update(correct_choice=nth_choice())
+    return len(questions), len(choices)
+
+
+def import_questions(quiz_id, items, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate a stream of question items and add them to a quiz in a single
+    transaction, `batch_size` questions at a time. Nothing is saved if any
+    item is invalid. Returns the number of questions and choices created.
+    """
+    questions = choices = 0
+    errors = []
+    batch = []
+    # One serializer validates every item, so its fields are built only once.
+    serializer = QuestionImportSerializer()
+    with transaction.atomic():
+        for number, item in enumerate(items, 1):
+            try:
+                question = serializer.run_validation(item)
+            except serializers.ValidationError as error:
+                errors.append({'item': number, 'errors': error.detail})
+                if len(errors) == MAX_IMPORT_ERRORS:
+                    break
+                continue
+            if not errors:
+                batch.append(question)
+                if len(batch) == batch_size:
+                    saved_questions, saved_choices = save_batch(quiz_id, batch)
+                    questions += saved_questions
+                    choices += saved_choices
+                    batch = []
+        if errors:
+            raise QuizImportError('Some questions are invalid. Nothing was imported.', errors)
+        if batch:
+            saved_questions, saved_choices = save_batch(quiz_id, batch)
+            questions += saved_questions
+            choices += saved_choices
+        # Bulk inserts send no signals.
+        bump_quiz_revision(pk=quiz_id)
+    return questions, choices
@@ -0,0 +1,233 @@
+import atexit
+import json
+import logging
+import os
+import threading
+from itertools import islice
+from uuid import UUID
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from .analytics import count_choice_answers
+from .grading import recount
+from .models import Answer, Choice, QuizSubmission
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def encode_entry(submission_id, question_id, choice_id):
+    return json.dumps({'submission': str(submission_id), 'question': question_id, 'choice': choice_id}).encode() + b'\n'
+
+
+class AnswerJournal:
+    """
+    Write-behind store for answers. `append` acknowledges answers once they are
+    fsynced to a local append-only file, and `flush` group-commits them to the
+    `Answer` table in bulk transactions, recomputing the submission counters.
+
+    Answers stay in `pending` until their transaction has committed, so
+    duplicates are detected against the journal as well as the database.
+    Entries left in the file by a crash are replayed by `open`; replaying an
+    answer that was already flushed is a no-op.
+    """
+
+    def __init__(self, path, flush_interval=0.05, batch_size=500, max_size=16 * 1024 * 1024):
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.file = None
+        self.thread = None
+        self.stopped = threading.Event()
+        self.wake = threading.Event()
+
+    def open(self):
+        self.file = self.open_file()
+        torn = False
+        for line in self.file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A write cut short by the crash, never acknowledged.
+                torn = True
+                break
+            self.pending[(UUID(entry['submission']), entry['question'])] = entry['choice']
+        if torn:
+            self.rewrite()
+        self.flush()
+        return self
+
+    def open_file(self):
+        file = open(self.path, 'a+b')
+        if fcntl is not None:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                file.close()
+                raise ImproperlyConfigured(f'The answer journal {self.path} is used by another process.')
+        file.seek(0)
+        return file
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='answer-journal', daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        if self.file is None:
+            return
+        self.stopped.set()
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+        try:
+            self.flush()
+        finally:
+            self.file.close()
+            self.file = None
+
+    def append(self, submission_id, answers):
+        """
+        Journal `answers`, a list of `(question_id, choice_id)` pairs of one
+        submission. Returns the ids of the questions that were already
+        answered; those answers are not journaled.
+        """
+        submission_id = UUID(str(submission_id))
+        with self.lock:
+            # Checked under the lock so no flush can move an answer from the
+            # journal to the database in between.
+            answered = {question_id for question_id, _ in answers if (submission_id, question_id) in self.pending}
+            answered.update(Answer.objects.filter(
+                submission=submission_id,
+                question__in=[question_id for question_id, _ in answers],
+            ).values_list('question', flat=True))
+            new_answers = [(question_id, choice_id) for question_id, choice_id in answers if question_id not in answered]
+            if new_answers:
+                self.file.write(b''.join(encode_entry(submission_id, question_id, choice_id) for question_id, choice_id in new_answers))
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                for question_id, choice_id in new_answers:
+                    self.pending[(submission_id, question_id)] = choice_id
+                if len(self.pending) >= self.batch_size:
+                    self.wake.set()
+        return answered
+
+    def pending_answers(self, submission_id):
+        """`{question_id: choice_id}` of the answers of a submission not flushed yet."""
+        submission_id = UUID(str(submission_id))
+        with self.lock:
+            return {question_id: choice_id for (pending_id, question_id), choice_id in self.pending.items() if pending_id == submission_id}
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Could not flush the answer journal')
+                connection.close()
+            else:
+                connection.close_if_unusable_or_obsolete()
+
+    def flush(self):
+        """Write the journaled answers to the database. Returns the number of answers flushed."""
+        flushed = 0
+        while True:
+            with self.lock:
+                batch = list(islice(self.pending.items(), self.batch_size))
+            if not batch:
+                return flushed
+            self.commit(batch)
+            with self.lock:
+                for key, _ in batch:
+                    del self.pending[key]
+                if not self.pending:
+                    self.file.truncate(0)
+                    os.fsync(self.file.fileno())
+                elif self.file.tell() > self.max_size:
+                    self.rewrite()
+            flushed += len(batch)
+
+    def commit(self, batch):
+        with transaction.atomic():
+            submissions = set(QuizSubmission.objects.filter(
+                pk__in={submission_id for (submission_id, _), _ in batch},
+            ).values_list('pk', flat=True))
+            # Graded against the answer key at flush time, which also drops
+            # answers whose question or choice was deleted in the meantime.
+            choices = {
+                choice_id: (question_id, question_type == 'mcq' and choice_id == correct_choice)
+                for choice_id, question_id, question_type, correct_choice in Choice.objects.filter(
+                    pk__in={choice_id for _, choice_id in batch},
+                ).values_list('id', 'question', 'question__type', 'question__correct_choice')
+            }
+            answers = [
+                Answer(submission_id=submission_id, question_id=question_id, choice_id=choice_id, is_correct=choices[choice_id][1])
+                for (submission_id, question_id), choice_id in batch
+                if submission_id in submissions and choice_id in choices and choices[choice_id][0] == question_id
+            ]
+            # Answers replayed after a crash may already be stored.
+            stored = set(Answer.objects.filter(
+                submission__in={answer.submission_id for answer in answers},
+                question__in={answer.question_id for answer in answers},
+            ).values_list('submission', 'question'))
+            answers = [answer for answer in answers if (answer.submission_id, answer.question_id) not in stored]
+            Answer.objects.bulk_create(answers)
+            count_choice_answers(answer.choice_id for answer in answers)
+            recount(QuizSubmission.objects.filter(pk__in={answer.submission_id for answer in answers}))
+
+    def rewrite(self):
+        """Replace the file with the pending answers only. Called with the lock held."""
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(b''.join(
+                encode_entry(submission_id, question_id, choice_id)
+                for (submission_id, question_id), choice_id in self.pending.items()
+            ))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+        self.file.close()
+        self.file = self.open_file()
+        self.file.seek(0, os.SEEK_END)
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """
+    The process-wide answer journal when `ANSWER_JOURNAL_PATH` is set, or None.
+    It is replayed and its flusher started on first use.
+    """
+    global _journal
+    if not getattr(settings, 'ANSWER_JOURNAL_PATH', None):
+        return None
+    if _journal is not None:
+        return _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = AnswerJournal(
+                settings.ANSWER_JOURNAL_PATH,
+                flush_interval=getattr(settings, 'ANSWER_JOURNAL_FLUSH_INTERVAL', 0.05),
+            ).open().start()
+            atexit.register(close_journal)
+        return _journal
+
+
+def close_journal():
+    """Flush and close the process-wide answer journal."""
+    global _journal
+    with _journal_lock:
+        if _journal is not None:
+            _journal.close()
+            _journal = None
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from .models import QuizSubmission
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATES = {'expired', 'completed', 'pending_review', 'reviewed'}
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+class QuizChannel:
+    def __init__(self, quiz_id):
+        self.quiz_id = quiz_id
+        self.subscribers = defaultdict(set)
+        self.last_seen = {}
+        self.expired = set()
+        self.wake = asyncio.Event()
+        self.task = None
+
+
+class LiveHub:
+    """
+    In-process fan-out of submission events. Each quiz with at least one
+    subscriber gets a single polling task whose one query serves every
+    subscriber of that quiz. Must run on the ASGI server's event loop.
+    """
+
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self.channels = {}
+
+    def subscribe(self, quiz_id, submission_id):
+        channel = self.channels.get(quiz_id)
+        if channel is None:
+            channel = self.channels[quiz_id] = QuizChannel(quiz_id)
+        queue = asyncio.Queue()
+        channel.subscribers[submission_id].add(queue)
+
+        if submission_id in channel.last_seen:
+            state, end_at = channel.last_seen[submission_id]
+            queue.put_nowait(('deadline', {'end_at': end_at}))
+            queue.put_nowait(('state', {'state': state}))
+            if submission_id in channel.expired:
+                queue.put_nowait(('expired', {'end_at': end_at}))
+        else:
+            channel.wake.set()
+
+        if channel.task is None:
+            channel.task = asyncio.create_task(self.poll(channel))
+        return queue
+
+    def unsubscribe(self, quiz_id, submission_id, queue):
+        channel = self.channels.get(quiz_id)
+        if channel is None:
+            return
+        channel.subscribers[submission_id].discard(queue)
+        if not channel.subscribers[submission_id]:
+            del channel.subscribers[submission_id]
+            channel.last_seen.pop(submission_id, None)
+            channel.expired.discard(submission_id)
+        if not channel.subscribers:
+            channel.task.cancel()
+            del self.channels[quiz_id]
+
+    async def poll(self, channel):
+        while True:
+            # Subscribers that arrive from here on are covered by this query.
+            channel.wake.clear()
+            now = timezone.now()
+            try:
+                rows = await sync_to_async(list)(
+                    QuizSubmission.objects.filter(quiz=channel.quiz_id, id__in=list(channel.subscribers))
+                    .values_list('id', 'state', 'end_at')
+                )
+            except Exception:
+                logger.exception('Could not poll submissions of quiz %s', channel.quiz_id)
+            else:
+                self.publish(channel, rows, now)
+
+            # Wake up in time to push the next deadline as it passes.
+            timeout = self.poll_interval
+            for submission_id, (state, end_at) in channel.last_seen.items():
+                if state == 'in_progress' and end_at and submission_id not in channel.expired:
+                    timeout = min(timeout, max((end_at - now).total_seconds(), 0))
+            try:
+                await asyncio.wait_for(channel.wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def publish(self, channel, rows, now):
+        for submission_id, state, end_at in rows:
+            previous = channel.last_seen.get(submission_id)
+            events = []
+            if previous is None or previous[1] != end_at:
+                events.append(('deadline', {'end_at': end_at}))
+                channel.expired.discard(submission_id)
+            if previous is None or previous[0] != state:
+                events.append(('state', {'state': state}))
+            if state == 'in_progress' and end_at and end_at <= now and submission_id not in channel.expired:
+                events.append(('expired', {'end_at': end_at}))
+                channel.expired.add(submission_id)
+            channel.last_seen[submission_id] = (state, end_at)
+
+            for queue in channel.subscribers.get(submission_id, ()):
+                for event in events:
+                    queue.put_nowait(event)
+
+    async def stream(self, quiz_id, submission_id, heartbeat):
+        """Server-sent events for one submission until it expires or finishes."""
+        queue = self.subscribe(quiz_id, submission_id)
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_event(event, data)
+                if event == 'expired' or data.get('state') in FINISHED_STATES:
+                    return
+        finally:
+            self.unsubscribe(quiz_id, submission_id, queue)
+
+
+hub = LiveHub(poll_interval=getattr(settings, 'LIVE_EVENTS_POLL_INTERVAL', 2))
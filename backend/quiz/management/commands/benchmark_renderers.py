@@ -0,0 +1,107 @@
+import json
+import timeit
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from quiz.renderers import MessagePackParser, MessagePackRenderer, ORJSONParser, ORJSONRenderer, msgpack
+
+
+def quiz_payload(questions, choices):
+    """A quiz with its nested questions and choices, shaped like `QuizSerializer` data."""
+    now = timezone.now()
+    return {
+        'id': uuid.uuid4(),
+        'title': 'Benchmark quiz',
+        'description': 'A synthetic quiz used to time the renderers.',
+        'password': '',
+        'creator': 1,
+        'start_time': now,
+        'duration': timedelta(minutes=30),
+        'created_at': now,
+        'questions': [
+            {
+                'id': question,
+                'content': f'Question {question}: which of the following is correct?',
+                'type': 'mcq',
+                'correct_choice': question * choices,
+                'choices': [
+                    {'id': question * choices + choice, 'content': f'Choice {choice}', 'question': question}
+                    for choice in range(choices)
+                ],
+            }
+            for question in range(questions)
+        ],
+    }
+
+
+def dashboard_payload(submissions):
+    """The quizzes a user took, shaped like the `QuizSubmissionGetView` dashboard."""
+    now = timezone.now()
+    return {
+        'next': None,
+        'previous': None,
+        'results': [
+            {
+                'id': uuid.uuid4(),
+                'quiz': {'id': uuid.uuid4(), 'title': f'Quiz {index}', 'start_time': now, 'duration': timedelta(minutes=30)},
+                'state': 'completed',
+                'score': Decimal('7.50'),
+                'started_at': now,
+                'finished_at': now,
+                'joined_at': now,
+            }
+            for index in range(submissions)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Time rendering and parsing of quiz and dashboard payloads of growing '
+        'size with DRF\'s JSON renderer, the orjson renderer and, when msgpack '
+        'is installed, the MessagePack renderer.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='Questions per quiz and submissions per dashboard.')
+        parser.add_argument('--choices', type=int, default=4, help='Choices per question.')
+        parser.add_argument('--repeat', type=int, default=5, help='Best of this many timing runs.')
+
+    def handle(self, *args, **options):
+        codecs = [('json', JSONRenderer(), JSONParser()), ('orjson', ORJSONRenderer(), ORJSONParser())]
+        if msgpack is not None:
+            codecs.append(('msgpack', MessagePackRenderer(), MessagePackParser()))
+
+        results = []
+        for size in options['sizes']:
+            payloads = [('quiz', quiz_payload(size, options['choices'])), ('dashboard', dashboard_payload(size))]
+            for name, data in payloads:
+                for codec, renderer, parser in codecs:
+                    body = renderer.render(data, renderer.media_type)
+                    results.append({
+                        'payload': name,
+                        'size': size,
+                        'codec': codec,
+                        'bytes': len(body),
+                        'render_us': self.time(lambda: renderer.render(data, renderer.media_type), options['repeat']),
+                        'parse_us': self.time(lambda: parser.parse(BytesIO(body)), options['repeat']),
+                    })
+
+        self.stdout.write(f'{"payload":<10} {"size":>6} {"codec":<8} {"bytes":>10} {"render µs":>11} {"parse µs":>10}')
+        for row in results:
+            self.stdout.write(
+                f'{row["payload"]:<10} {row["size"]:>6} {row["codec"]:<8} {row["bytes"]:>10} '
+                f'{row["render_us"]:>11.1f} {row["parse_us"]:>10.1f}'
+            )
+        if options['verbosity'] > 1:
+            self.stdout.write(json.dumps(results, indent=2))
+
+    def time(self, function, repeat):
+        timer = timeit.Timer(function)
+        number, _ = timer.autorange()
+        return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
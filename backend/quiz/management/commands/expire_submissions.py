@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from quiz.sweeper import expire_submissions
+
+
+class Command(BaseCommand):
+    help = 'Expire running submissions whose deadline has passed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of submissions finalized per UPDATE.',
+        )
+
+    def handle(self, *args, **options):
+        expired = expire_submissions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} submissions'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from quiz.grading import grade_quiz
+from quiz.management.utils import ensure_quiz_exists
+
+
+class Command(BaseCommand):
+    help = 'Grade every submission of a quiz.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id')
+        parser.add_argument(
+            '--regrade',
+            action='store_true',
+            help='Keep the current scores in score_before_regrade before rescoring.',
+        )
+
+    def handle(self, *args, **options):
+        quiz_id = options['quiz_id']
+        ensure_quiz_exists(quiz_id)
+
+        graded = grade_quiz(quiz_id, regrade=options['regrade'])
+        self.stdout.write(self.style.SUCCESS(f'Graded {graded} submissions'))
@@ -0,0 +1,35 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from quiz.importer import QuizImportError, import_questions, iter_csv, iter_json, read_chunks
+from quiz.management.utils import ensure_quiz_exists
+
+FORMATS = {'json': iter_json, 'ndjson': iter_json, 'csv': iter_csv}
+
+
+class Command(BaseCommand):
+    help = 'Import a bank of questions into a quiz from a JSON, NDJSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension.')
+
+    def handle(self, *args, **options):
+        quiz_id = options['quiz_id']
+        ensure_quiz_exists(quiz_id)
+
+        path = Path(options['path'])
+        parse = FORMATS.get(options['format'] or path.suffix.lstrip('.').lower())
+        if parse is None:
+            raise CommandError('Pass --format for files without a .json, .ndjson or .csv extension')
+
+        try:
+            with path.open('rb') as file:
+                questions, choices = import_questions(quiz_id, parse(read_chunks(file)))
+        except QuizImportError as error:
+            for error_item in error.errors:
+                self.stderr.write(f'Item {error_item["item"]}: {error_item["errors"]}')
+            raise CommandError(str(error))
+        except OSError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f'Imported {questions} questions and {choices} choices'))
@@ -0,0 +1,214 @@
+import json
+import logging
+import math
+import random
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+from quiz.analytics import create_choice_stats
+from quiz.journal import close_journal
+from quiz.models import Choice, CustomUser, Question, Quiz
+from quiz.serializers import CustomTokenObtainPairSerializer
+
+ENDPOINTS = ['join', 'start', 'questions', 'submit', 'dashboard']
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway SQLite database with synthetic quizzes and drive the '
+        'join -> start -> questions -> submit -> dashboard flow with concurrent '
+        'workers, then print a JSON latency and query report.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--creators', type=int, default=2)
+        parser.add_argument('--quizzes', type=int, default=2, help='Quizzes per creator.')
+        parser.add_argument('--questions', type=int, default=10, help='Questions per quiz.')
+        parser.add_argument('--choices', type=int, default=4, help='Choices per question.')
+        parser.add_argument('--participants', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--batch', action='store_true', help='Submit all answers through the batch endpoint.')
+        parser.add_argument('--write-behind', action='store_true', help='Submit answers through the write-behind answer journal.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the report to this file instead of stdout.')
+        parser.add_argument('--baseline', help='A previous report to compare against.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The load test only runs against SQLite.')
+
+        if options['verbosity'] < 2:
+            # Failed requests are counted in the report instead of logged one by one.
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        setup_test_environment(debug=False)
+        with tempfile.TemporaryDirectory() as directory:
+            # A file instead of the default in-memory test database, so that
+            # every worker thread opens its own connection to the same data.
+            old_name, test_name = connection.settings_dict['NAME'], connection.settings_dict['TEST']['NAME']
+            connection.settings_dict['TEST']['NAME'] = str(Path(directory) / 'loadtest.sqlite3')
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                participants = self.seed(options)
+                journal_path = str(Path(directory) / 'answers.journal') if options['write_behind'] else None
+                with override_settings(ANSWER_JOURNAL_PATH=journal_path):
+                    try:
+                        report = self.run(participants, options)
+                    finally:
+                        close_journal()
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                connection.settings_dict['TEST']['NAME'] = test_name
+        teardown_test_environment()
+
+        if options['baseline']:
+            report['comparison'] = self.compare(report, json.loads(Path(options['baseline']).read_text()))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def seed(self, options):
+        password = make_password('loadtest')
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'loadtest{i}', email=f'loadtest{i}@example.com', name=f'Load Test {i}', password=password)
+            for i in range(options['creators'] + options['participants'])
+        ])
+        creators, participants = users[:options['creators']], users[options['creators']:]
+
+        quizzes = Quiz.objects.bulk_create([
+            Quiz(title=f'Load test {i}', creator=creator, password='', duration=timedelta(hours=1))
+            for creator in creators
+            for i in range(options['quizzes'])
+        ])
+        questions = Question.objects.bulk_create([
+            Question(quiz=quiz, content=f'Question {i}', type='mcq')
+            for quiz in quizzes
+            for i in range(options['questions'])
+        ])
+        choices = Choice.objects.bulk_create([
+            Choice(question=question, content=f'Choice {i}')
+            for question in questions
+            for i in range(options['choices'])
+        ])
+        create_choice_stats(choices)
+        for question, choice in zip(questions, choices[::options['choices']]):
+            question.correct_choice = choice
+        Question.objects.bulk_update(questions, ['correct_choice'])
+
+        return [
+            (str(CustomTokenObtainPairSerializer.get_token(user).access_token), quizzes[i % len(quizzes)].id)
+            for i, user in enumerate(participants)
+        ]
+
+    def run(self, participants, options):
+        samples = defaultdict(list)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            # One generator per participant: threads sharing one would draw in
+            # scheduling order, and the same seed would pick other answers.
+            runs = executor.map(
+                lambda indexed: self.take_quiz(*indexed[1], random.Random(options['seed'] + indexed[0]), batch=options['batch']),
+                enumerate(participants),
+            )
+            for participant_samples in runs:
+                for endpoint, sample in participant_samples:
+                    samples[endpoint].append(sample)
+        elapsed = time.perf_counter() - started
+
+        total = sum(len(endpoint_samples) for endpoint_samples in samples.values())
+        return {
+            'config': {key: options[key] for key in (
+                'creators', 'quizzes', 'questions', 'choices', 'participants', 'workers', 'batch', 'write_behind', 'seed',
+            )},
+            'duration_seconds': round(elapsed, 3),
+            'requests': total,
+            'throughput': round(total / elapsed, 2),
+            'endpoints': {
+                endpoint: self.summarize(samples[endpoint], elapsed)
+                for endpoint in ENDPOINTS if samples[endpoint]
+            },
+        }
+
+    def take_quiz(self, token, quiz_id, rng, batch=False):
+        client = APIClient(raise_request_exception=False)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        samples = []
+
+        def call(endpoint, method, url, data=None):
+            with CaptureQueriesContext(connections['default']) as queries:
+                began = time.perf_counter()
+                response = getattr(client, method)(url, data, format='json')
+                duration = time.perf_counter() - began
+            samples.append((endpoint, (duration, len(queries), response.status_code)))
+            return response
+
+        response = call('join', 'post', reverse('join-quiz', args=[quiz_id]))
+        if response.status_code != 200:
+            return samples
+        submission_id = response.data['submission_id']
+        call('start', 'post', reverse('start-submission-session', args=[quiz_id, submission_id]))
+
+        response = call('questions', 'get', reverse('show-quiz-question', args=[quiz_id, submission_id]))
+        if response.status_code == 200:
+            answers = [
+                {'question': question['id'], 'choice': rng.choice(question['choices'])['id']}
+                for question in json.loads(response.content)['questions'] if question['choices']
+            ]
+            if batch and answers:
+                call('submit', 'post', reverse('submit-answer-batch', args=[quiz_id, submission_id]), {'answers': answers})
+            else:
+                for answer in answers:
+                    call('submit', 'post', reverse('submit-answer', args=[quiz_id, submission_id]), answer)
+
+        call('dashboard', 'get', reverse('user-quizzes'))
+        connections['default'].close()
+        return samples
+
+    def summarize(self, samples, elapsed):
+        latencies = [duration * 1000 for duration, _, _ in samples]
+        queries = [count for _, count, _ in samples]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, _, status in samples if status >= 400),
+            'throughput': round(len(samples) / elapsed, 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+        }
+
+    def compare(self, report, baseline):
+        comparison = {'throughput_change': self.change(baseline.get('throughput'), report['throughput'])}
+        for endpoint, stats in report['endpoints'].items():
+            previous = baseline.get('endpoints', {}).get(endpoint)
+            if previous:
+                comparison[endpoint] = {
+                    key: self.change(previous.get(key), stats[key])
+                    for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_mean')
+                }
+        return comparison
+
+    def change(self, before, after):
+        if not before:
+            return None
+        return f'{(after - before) / before:+.1%}'
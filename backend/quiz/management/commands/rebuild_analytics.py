@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from quiz.analytics import rebuild_choice_stats
+from quiz.management.utils import ensure_quiz_exists
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-choice answer statistics from the stored answers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', nargs='?', help='Only rebuild this quiz. Defaults to every quiz.')
+
+    def handle(self, *args, **options):
+        quiz_id = options['quiz_id']
+        if quiz_id is not None:
+            ensure_quiz_exists(quiz_id)
+
+        counted = rebuild_choice_stats(quiz_id)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics of {counted} choices'))
@@ -0,0 +1,13 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import CommandError
+from quiz.models import Quiz
+
+
+def ensure_quiz_exists(quiz_id):
+    """Raise `CommandError` unless `quiz_id` is the id of an existing quiz."""
+    try:
+        exists = Quiz.objects.filter(id=quiz_id).exists()
+    except ValidationError:
+        exists = False
+    if not exists:
+        raise CommandError(f'Quiz "{quiz_id}" does not exist')
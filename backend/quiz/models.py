@@ -1,7 +1,10 @@
 import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
 from .choices import question_type, quiz_state
 
 
@@ -16,6 +19,19 @@ class CustomUser(AbstractUser):
         return self.email
 
 
+def _count_by_quiz(queryset):
+    counts = queryset.filter(quiz=OuterRef('pk')).order_by().values('quiz').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), Value(0))
+
+
+class QuizQuerySet(models.QuerySet):
+    def with_counts(self):
+        return self.annotate(
+            question_count=_count_by_quiz(Question.objects.all()),
+            submission_count=_count_by_quiz(QuizSubmission.objects.all()),
+        )
+
+
 class Quiz(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False) 
     title = models.CharField(max_length=255)
@@ -24,6 +40,16 @@ class Quiz(models.Model):
     creator = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     start_time = models.DateTimeField(null=True, blank=True)
     duration = models.DurationField(null=True, blank=True)
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = QuizQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='quiz_created_at_id'),
+            models.Index(fields=['creator', 'created_at', 'id'], name='quiz_creator_created_at_id'),
+        ]
 
     def __str__(self):
         return self.title
@@ -60,10 +86,21 @@ class QuizSubmission(models.Model):
 
     score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     score_before_regrade = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    answered_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
     
-    state = models.CharField(choices=quiz_state, max_length=14)
+    state = models.CharField(choices=quiz_state, max_length=14, default='not_started')
     has_seen_results = models.BooleanField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'quiz'], name='unique_submission_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['state', 'end_at'], name='submission_state_end_at'),
+            models.Index(fields=['user', 'joined_at', 'id'], name='submission_user_joined_at_id'),
+        ]
+
     def __str__(self):
         return f"[{self.state}] {self.quiz.title} - {self.user.email} ({self.score})"
     
@@ -71,9 +108,33 @@ class QuizSubmission(models.Model):
 class Answer(models.Model):
     submission = models.ForeignKey(QuizSubmission, on_delete=models.CASCADE)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
-    choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    # MCQs are answered with a choice, essays with a text.
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, null=True, blank=True)
+    text = models.TextField(blank=True)
     is_correct = models.BooleanField(null=True, blank=True)
 
+    # Essays wait for a grader, who leases them from the review queue.
+    needs_review = models.BooleanField(default=False)
+    review_lease = models.UUIDField(null=True, blank=True)
+    review_lease_expires = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['submission', 'question'], name='unique_answer_per_question'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'id'], condition=Q(needs_review=True), name='answer_review_queue'),
+        ]
+
     def __str__(self):
         return f"{self.submission.user.email} - {self.submission.quiz.title} - {self.question.content}"
-    
\ No newline at end of file
+    
+
+
+class ChoiceStats(models.Model):
+    """Number of answers given to a choice, kept up to date as answers are written."""
+    choice = models.OneToOneField(Choice, primary_key=True, related_name='stats', on_delete=models.CASCADE)
+    answer_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.choice.content} ({self.answer_count})"
@@ -0,0 +1,74 @@
+from functools import reduce
+from operator import or_
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+POSITION_SEPARATOR = '|'
+
+
+class NewestFirstPagination(CursorPagination):
+    """
+    Keyset pagination on `(created_at, id)`, newest first. Every page is an
+    index range scan, so deep pages cost the same as the first one.
+
+    DRF's cursor only keeps the first ordering field and skips rows sharing
+    its value with an offset. Here the cursor holds every ordering field and
+    pages are filtered on the whole tuple, so ties need no offset.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor = super().decode_cursor(request)
+        self.keyset_cursor = cursor
+        if cursor is not None and cursor.position is not None:
+            queryset = queryset.filter(self.keyset_filter(queryset, self.get_ordering(request, queryset, view), cursor))
+        page = super().paginate_queryset(queryset, request, view)
+
+        # The page was read from the filtered queryset without a position, so
+        # the link back to where it started is restored here.
+        self.cursor = cursor
+        if cursor is not None and cursor.position is not None:
+            if cursor.reverse:
+                self.has_next, self.next_position = True, cursor.position
+            else:
+                self.has_previous, self.previous_position = True, cursor.position
+            self.display_page_controls = self.template is not None
+        return page
+
+    def decode_cursor(self, request):
+        # `paginate_queryset` already applied the position.
+        cursor = self.keyset_cursor
+        return cursor._replace(position=None) if cursor is not None else None
+
+    def keyset_filter(self, queryset, ordering, cursor):
+        """Rows after the cursor position: `(a < x) OR (a = x AND b < y)` for a descending `(a, b)`."""
+        values = cursor.position.split(POSITION_SEPARATOR)
+        if len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        clauses = []
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            try:
+                value = queryset.model._meta.get_field(name).to_python(value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            lookup = 'lt' if cursor.reverse != field.startswith('-') else 'gt'
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': value}))
+            equal[name] = value
+        return reduce(or_, clauses)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return POSITION_SEPARATOR.join(
+            str(instance[field.lstrip('-')] if isinstance(instance, dict) else getattr(instance, field.lstrip('-')))
+            for field in ordering
+        )
+
+
+class RecentlyJoinedPagination(NewestFirstPagination):
+    ordering = ('-joined_at', '-id')
@@ -1,25 +1,52 @@
 from rest_framework import permissions
+from rest_framework.exceptions import NotFound
 from .models import Quiz, Question
 
+
+def get_quiz_ownership(request, view):
+    """
+    Resolve the quiz addressed by the view's `quiz_id` or `question_id` kwarg
+    to a `(quiz_id, creator_id)` pair with a single query, memoized on the
+    request. Returns None when the view addresses neither.
+    """
+    if hasattr(request, 'quiz_ownership'):
+        return request.quiz_ownership
+
+    quiz_id = view.kwargs.get('quiz_id')
+    question_id = view.kwargs.get('question_id')
+
+    if quiz_id:
+        ownership = Quiz.objects.filter(id=quiz_id).values_list('id', 'creator_id').first()
+        if ownership is None:
+            raise NotFound('Quiz not found')
+    elif question_id:
+        ownership = Question.objects.filter(id=question_id).values_list('quiz_id', 'quiz__creator_id').first()
+        if ownership is None:
+            raise NotFound('Question not found')
+    else:
+        ownership = None
+
+    request.quiz_ownership = ownership
+    return ownership
+
+
 class IsCreator(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
+        ownership = get_quiz_ownership(request, view)
         if isinstance(obj, Quiz):
-            return obj.creator == request.user
+            return obj.creator_id == request.user.id
         if isinstance(obj, Question):
-            return obj.quiz.creator == request.user
-        if hasattr(obj, 'question'):
-            return obj.question.quiz.creator == request.user
+            if ownership:
+                return obj.quiz_id == ownership[0] and ownership[1] == request.user.id
+            return obj.quiz.creator_id == request.user.id
+        if hasattr(obj, 'question_id'):
+            if ownership and view.kwargs.get('question_id'):
+                return obj.question_id == view.kwargs['question_id'] and ownership[1] == request.user.id
+            return obj.question.quiz.creator_id == request.user.id
         return False
 
     def has_permission(self, request, view):
-        quiz_id = view.kwargs.get('quiz_id')
-        question_id = view.kwargs.get('question_id')
-
-        if quiz_id:
-            quiz = Quiz.objects.get(id=quiz_id)
-            return quiz.creator == request.user
-        elif question_id:
-            question = Question.objects.get(id=question_id)
-            return question.quiz.creator == request.user
-
-        return True
+        ownership = get_quiz_ownership(request, view)
+        if ownership is None:
+            return True
+        return ownership[1] == request.user.id
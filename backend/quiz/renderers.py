@@ -0,0 +1,86 @@
+import orjson
+from django.conf import settings
+from django.utils.http import parse_header_parameters
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional.
+    msgpack = None
+
+# Types neither library handles natively (Decimal, timedelta, lazy strings,
+# querysets...) are converted the same way DRF's JSONRenderer converts them.
+encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(renderers.BaseRenderer):
+    """JSON renderer backed by orjson. Datetimes, dates and UUIDs are encoded natively."""
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+        if accepted_media_type and 'indent' in parse_header_parameters(accepted_media_type)[1]:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=encode_default, option=option)
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as error:
+            raise ParseError(f'JSON parse error - {error}')
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    MessagePack renderer, used when the client asks for `application/msgpack`.
+    Aware datetimes are encoded as MessagePack timestamps.
+    """
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, datetime=settings.USE_TZ)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), timestamp=3)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as error:
+            raise ParseError(f'MessagePack parse error - {error}')
+
+
+def render_map(renderer, items):
+    """
+    Render a mapping of `(key, value)` pairs whose values are already rendered
+    by `renderer`, so cached bytes are embedded without being decoded again.
+    """
+    if isinstance(renderer, MessagePackRenderer):
+        header = msgpack.Packer().pack_map_header(len(items))
+        return header + b''.join(msgpack.packb(key) + value for key, value in items)
+    return b'{' + b','.join(orjson.dumps(key) + b':' + value for key, value in items) + b'}'
+
+
+# The renderers that produce plain bytes from data, for views that cache their output.
+DATA_RENDERERS = [ORJSONRenderer] + ([MessagePackRenderer] if msgpack else [])
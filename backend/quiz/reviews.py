@@ -0,0 +1,72 @@
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from .grading import rescore
+from .models import Answer, Question, QuizSubmission
+
+
+def claim_answers(quiz_id, limit, question_id=None, now=None):
+    """
+    Lease up to `limit` essay answers of a quiz that wait for review, oldest
+    first and one question at a time. Each question is read with a range scan
+    of the review queue index that stops after `limit` rows, so the cost does
+    not grow with the backlog. Answers under another live lease are skipped,
+    and expired leases are taken over.
+
+    Returns the lease, its expiry and the ids of the leased answers.
+    """
+    now = now or timezone.now()
+    lease = uuid.uuid4()
+    expires = now + timedelta(seconds=getattr(settings, 'REVIEW_LEASE_SECONDS', 300))
+    questions = Question.objects.filter(quiz=quiz_id, type='essay')
+    if question_id is not None:
+        questions = questions.filter(pk=question_id)
+
+    claimed = []
+    with transaction.atomic():
+        for question in questions.order_by('id').values_list('id', flat=True):
+            claimed += (
+                Answer.objects.select_for_update(skip_locked=True)
+                .filter(question=question, needs_review=True)
+                .filter(Q(review_lease_expires__isnull=True) | Q(review_lease_expires__lte=now))
+                .order_by('id')
+                .values_list('id', flat=True)[:limit - len(claimed)]
+            )
+            if len(claimed) == limit:
+                break
+        Answer.objects.filter(pk__in=claimed).update(review_lease=lease, review_lease_expires=expires)
+    return lease, expires, claimed
+
+
+def grade_answers(quiz_id, lease, grades, now=None):
+    """
+    Store the grades, a `{answer_id: is_correct}` dict, of answers still held
+    under `lease`, then rescore only the submissions they belong to. A
+    submission waiting for review becomes reviewed once none of its answers
+    need review. Returns the ids of the graded answers.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        held = dict(Answer.objects.filter(
+            pk__in=grades,
+            question__quiz=quiz_id,
+            needs_review=True,
+            review_lease=lease,
+            review_lease_expires__gt=now,
+        ).values_list('id', 'submission'))
+        for verdict in (True, False):
+            Answer.objects.filter(pk__in=[answer for answer in held if grades[answer] is verdict]).update(
+                is_correct=verdict,
+                needs_review=False,
+                review_lease=None,
+                review_lease_expires=None,
+            )
+
+        submissions = QuizSubmission.objects.filter(pk__in=set(held.values()))
+        rescore(submissions)
+        pending = Answer.objects.filter(submission=OuterRef('pk'), needs_review=True)
+        submissions.filter(state='pending_review').exclude(Exists(pending)).update(state='reviewed')
+    return sorted(held)
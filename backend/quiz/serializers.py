@@ -1,8 +1,6 @@
-from datetime import timedelta
-from django.utils import timezone
 from rest_framework import serializers
-from django.utils.dateparse import parse_datetime
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .choices import question_type
 from .models import Answer, Choice, CustomUser, Question, Quiz, QuizSubmission
 
 
@@ -65,13 +63,12 @@ class QuizSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Quiz
-        fields = ['id', 'title', 'description', 'password', 'creator', 'start_time', 'duration', 'questions']
+        fields = ['id', 'title', 'description', 'password', 'creator', 'start_time', 'duration', 'created_at', 'questions']
         read_only_fields = ['creator']
 
     def create(self, validated_data):
         request = self.context.get('request')
-        user = request.user
-        validated_data['creator'] = user
+        validated_data['creator_id'] = request.user.id
         return super().create(validated_data)
     
     # def validate_start_time(self, value):
@@ -85,12 +82,27 @@ class QuizSerializer(serializers.ModelSerializer):
 class QuizListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Quiz
-        fields = ['id', 'title', 'description', 'start_time', 'duration']
+        fields = ['id', 'title', 'description', 'start_time', 'duration', 'created_at']
+
+
+class QuizSummarySerializer(serializers.ModelSerializer):
+    question_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Quiz
+        fields = ['id', 'title', 'description', 'start_time', 'duration', 'question_count']
+
+
+class CreatedQuizSummarySerializer(QuizSummarySerializer):
+    submission_count = serializers.IntegerField(read_only=True)
+
+    class Meta(QuizSummarySerializer.Meta):
+        fields = QuizSummarySerializer.Meta.fields + ['submission_count']
 
 
 class QuizSubmissionSerializer(serializers.ModelSerializer):
     quiz_title = serializers.CharField(source='quiz.title', read_only=True)
-    quiz = QuizSerializer(read_only=True)
+    quiz = QuizSummarySerializer(read_only=True)
 
     class Meta:
         model = QuizSubmission
@@ -98,18 +110,102 @@ class QuizSubmissionSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'joined_at', 'time_spent']
 
 
-class AnswerSerializer(serializers.ModelSerializer):
+class SubmissionProgressSerializer(serializers.ModelSerializer):
+    question_count = serializers.IntegerField(read_only=True)
+
     class Meta:
-        model = Answer
-        fields = ['submission', 'question', 'choice', 'is_correct']
+        model = QuizSubmission
+        fields = ['id', 'state', 'answered_count', 'question_count', 'correct_count', 'score', 'end_at']
+
+
+def answer_errors(item, entry):
+    """Errors of an answer item against the answer key entry of its question, or None."""
+    if entry['type'] == 'essay':
+        if not item.get('text'):
+            return {'text': ['Essay questions are answered with a text.']}
+    elif item.get('choice') not in entry['choices']:
+        return {'choice': ['Choice not found']}
+    return None
+
+
+class AnswerItemSerializer(serializers.Serializer):
+    question = serializers.IntegerField()
+    choice = serializers.IntegerField(required=False)
+    text = serializers.CharField(required=False)
+
+
+class AnswerBatchSerializer(serializers.Serializer):
+    answers = AnswerItemSerializer(many=True, allow_empty=False)
+
+    def validate_answers(self, value):
+        answer_key = self.context['answer_key']
+        errors = []
+        seen = set()
+        for item in value:
+            entry = answer_key.get(item['question'])
+            if entry is None:
+                errors.append({'question': ['Question not found']})
+            elif item['question'] in seen:
+                errors.append({'question': ['Question is repeated in this batch']})
+            else:
+                errors.append(answer_errors(item, entry) or {})
+            seen.add(item['question'])
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return value
 
-    def create(self, validated_data):
-        # Remove 'user' from validated_data if it exists
-        validated_data.pop('user', None)
-        return Answer.objects.create(**validated_data)
 
+class QuestionImportSerializer(serializers.Serializer):
+    content = serializers.CharField()
+    type = serializers.ChoiceField(choices=question_type, default='mcq')
+    choices = serializers.ListField(child=serializers.CharField(), default=list)
+    # Index of the correct choice in `choices`, starting at 0.
+    correct_choice = serializers.IntegerField(min_value=0, required=False, allow_null=True)
 
-class QuizQuestionSerializer(serializers.ModelSerializer):
+    def validate(self, data):
+        correct_choice = data.get('correct_choice')
+        if correct_choice is not None and correct_choice >= len(data['choices']):
+            raise serializers.ValidationError({'correct_choice': ['There is no choice with this index.']})
+        return data
+
+
+class RosterSerializer(serializers.Serializer):
+    emails = serializers.ListField(child=serializers.EmailField(), allow_empty=False)
+
+
+class QuizCloneSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255, required=False)
+    start_time = serializers.DateTimeField(required=False, allow_null=True)
+
+
+class ResumeSubmissionSerializer(serializers.ModelSerializer):
     class Meta:
-        model = Question
-        exclude = ['correct_choice']
\ No newline at end of file
+        model = QuizSubmission
+        fields = ['id', 'state', 'started_at', 'end_at', 'answered_count']
+
+
+class ReviewClaimSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    question = serializers.IntegerField(required=False)
+
+
+class ReviewGradeItemSerializer(serializers.Serializer):
+    answer = serializers.IntegerField()
+    is_correct = serializers.BooleanField()
+
+
+class ReviewGradeSerializer(serializers.Serializer):
+    lease = serializers.UUIDField()
+    grades = ReviewGradeItemSerializer(many=True, allow_empty=False)
+
+    def validate_grades(self, value):
+        answers = [item['answer'] for item in value]
+        if len(set(answers)) != len(answers):
+            raise serializers.ValidationError('An answer is graded more than once.')
+        return value
+
+
+class ReviewAnswerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Answer
+        fields = ['id', 'submission', 'question', 'text']
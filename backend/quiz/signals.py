@@ -0,0 +1,71 @@
+from django.db.models import F, Model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .analytics import create_choice_stats, discount_answered_choices
+from .authentication import user_cache
+from .cache import bump_quiz_revision, invalidate_quiz_duration
+from .models import Answer, Choice, CustomUser, Question, Quiz, QuizSubmission
+
+
+def _is_cascade(instance, origin):
+    # Rows removed by a parent's cascade are covered by the parent's own handler.
+    return isinstance(origin, Model) and origin is not instance
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(pre_save, sender=Quiz)
+def quiz_pre_save(sender, instance, **kwargs):
+    # Bumped in the database, so a stale instance never moves it backwards.
+    if not instance._state.adding:
+        instance.revision = F('revision') + 1
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created:
+        if update_fields is not None and 'revision' not in update_fields:
+            bump_quiz_revision(pk=instance.pk)
+        instance.refresh_from_db(fields=['revision'])
+    invalidate_quiz_duration(instance.pk)
+
+
+@receiver(post_delete, sender=Quiz)
+def quiz_deleted(sender, instance, **kwargs):
+    invalidate_quiz_duration(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, **kwargs):
+    bump_quiz_revision(pk=instance.quiz_id)
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, origin=None, **kwargs):
+    if not _is_cascade(instance, origin):
+        bump_quiz_revision(pk=instance.quiz_id)
+
+
+@receiver(post_save, sender=Choice)
+def choice_saved(sender, instance, created, **kwargs):
+    if created:
+        create_choice_stats([instance])
+    bump_quiz_revision(questions__id=instance.question_id)
+
+
+@receiver(post_delete, sender=Choice)
+def choice_deleted(sender, instance, origin=None, **kwargs):
+    if not _is_cascade(instance, origin):
+        bump_quiz_revision(questions__id=instance.question_id)
+
+
+@receiver(pre_delete, sender=QuizSubmission)
+def submission_deleting(sender, instance, origin=None, **kwargs):
+    # The answers go with the submission. When the whole quiz is deleted its
+    # choice statistics go too, so there is nothing to take them off.
+    if isinstance(origin, Quiz) or getattr(origin, 'model', None) is Quiz:
+        return
+    discount_answered_choices(Answer.objects.filter(submission=instance.pk, choice__isnull=False))
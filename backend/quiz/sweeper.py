@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Exists, F, Func, IntegerField, OuterRef, Value, When
+from django.utils import timezone
+from .models import Answer, QuizSubmission
+
+logger = logging.getLogger(__name__)
+
+
+class SecondsBetween(Func):
+    """Whole seconds from the second datetime expression to the first."""
+    output_field = IntegerField()
+    template = 'CAST(EXTRACT(EPOCH FROM (%(expressions)s)) AS INTEGER)'
+    arg_joiner = ' - '
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(ROUND((julianday(%(expressions)s)) * 86400) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        end, start = self.source_expressions
+        return Func(start, end, function='TIMESTAMPDIFF', template='%(function)s(SECOND, %(expressions)s)').as_sql(
+            compiler, connection, **extra_context,
+        )
+
+
+def expire_submissions(now=None, batch_size=1000):
+    """
+    Finalize running submissions whose deadline has passed, in batches of
+    `batch_size` UPDATEs driven by the (state, end_at) index. No row is loaded
+    into Python. Returns the number of expired submissions.
+    """
+    now = now or timezone.now()
+    overdue = QuizSubmission.objects.filter(state='in_progress', end_at__lte=now)
+    # Submissions with ungraded essays wait for review instead.
+    needs_review = Exists(Answer.objects.filter(submission=OuterRef('pk'), needs_review=True))
+    expired = 0
+    while True:
+        with transaction.atomic():
+            batch = overdue.order_by('end_at').values('pk')[:batch_size]
+            updated = overdue.filter(pk__in=batch).update(
+                state=Case(When(needs_review, then=Value('pending_review')), default=Value('expired')),
+                finished_at=F('end_at'),
+                time_spent=SecondsBetween('end_at', 'started_at'),
+            )
+        expired += updated
+        if updated < batch_size:
+            return expired
+
+
+def run_periodically(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            expired = expire_submissions()
+            if expired:
+                logger.info('Expired %d submissions', expired)
+        except Exception:
+            logger.exception('Submission sweep failed')
+        finally:
+            connection.close()
+
+
+def start_periodic_sweeper():
+    """Run `expire_submissions` every `SUBMISSION_SWEEPER_INTERVAL` seconds in a daemon thread, if set."""
+    interval = getattr(settings, 'SUBMISSION_SWEEPER_INTERVAL', None)
+    if not interval:
+        return None
+    thread = threading.Thread(target=run_periodically, args=(interval,), name='submission-sweeper', daemon=True)
+    thread.start()
+    return thread
@@ -1,3 +1,1322 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from .models import Answer, Choice, ChoiceStats, CustomUser, Question, Quiz, QuizSubmission
+from quizwhiz.metrics import Histogram, MetricsRegistry, registry
+from quizwhiz.routers import ReplicaRouter, ReplicaRoutingMiddleware
+from .analytics import create_choice_stats, rebuild_choice_stats
+from .authentication import UserCache
+from .cache import get_quiz_duration
+from .grading import build_answer, grade_quiz, keep_score_before_regrade, mark_answers, record_answers, regrade_question, upsert_answer
+from .importer import import_questions
+from .journal import AnswerJournal
+from .live import LiveHub, QuizChannel
+from .renderers import ORJSONRenderer, msgpack
+from .reviews import claim_answers
+from .serializers import CustomTokenObtainPairSerializer
+from .sweeper import expire_submissions
+from .views import CreatedQuizzesView, QuizCreateView, QuizSubmissionBatchView
 
-# Create your tests here.
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QuizWhizTestCase(APITestCase):
+    def create_user(self, username):
+        return CustomUser.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='password',
+            name=username.title(),
+        )
+
+    def authenticate(self, user):
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def create_quiz(self, creator, questions=3, choices=3):
+        quiz = Quiz.objects.create(title='Quiz', creator=creator, duration=timedelta(minutes=30), password='')
+        for i in range(questions):
+            question = Question.objects.create(quiz=quiz, content=f'Question {i}', type='mcq')
+            created = Choice.objects.bulk_create([Choice(question=question, content=f'Choice {j}') for j in range(choices)])
+            create_choice_stats(created)
+            question.correct_choice = created[0]
+            question.save()
+        return quiz
+
+    def create_submission(self, quiz, user, answered=True):
+        submission = QuizSubmission.objects.create(quiz=quiz, user=user, state='not_started')
+        if answered:
+            Answer.objects.bulk_create([
+                Answer(submission=submission, question=question, choice=question.correct_choice, is_correct=True)
+                for question in quiz.questions.all()
+            ])
+        return submission
+
+
+class ListQueryBudgetTests(QuizWhizTestCase):
+    """
+    List endpoints must run a fixed number of queries no matter how many
+    quizzes, questions and choices they return. The user comes from the
+    token claims, so no query loads it.
+    """
+
+    def setUp(self):
+        self.user = self.create_user('student')
+        self.authenticate(self.user)
+
+    def populate(self, quizzes):
+        creator = self.create_user(f'creator{Quiz.objects.count()}')
+        for _ in range(quizzes):
+            self.create_quiz(self.user)
+            self.create_submission(self.create_quiz(creator), self.user)
+
+    def assertQueryBudget(self, url, budget):
+        for quizzes in (1, 4):
+            self.populate(quizzes)
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_dashboard(self):
+        self.assertQueryBudget(reverse('user-quizzes'), 3)
+
+    def test_quiz_list(self):
+        self.assertQueryBudget(reverse('quiz-create'), 3)
+
+    def test_created_quizzes(self):
+        self.assertQueryBudget(reverse('created-quizzes'), 1)
+
+    def test_taken_quizzes(self):
+        self.assertQueryBudget(reverse('taken-quizzes'), 1)
+
+    def test_dashboard_counts(self):
+        quiz = self.create_quiz(self.user, questions=2)
+        self.create_submission(quiz, self.create_user('other'))
+        taken = self.create_quiz(self.create_user('teacher'), questions=5)
+        self.create_submission(taken, self.user, answered=False)
+
+        response = self.client.get(reverse('user-quizzes'))
+
+        created = response.data['created']['results'][0]
+        self.assertEqual(created['question_count'], 2)
+        self.assertEqual(created['submission_count'], 1)
+        self.assertEqual(response.data['participated']['results'][0]['quiz']['question_count'], 5)
+
+    def test_quiz_list_summary(self):
+        self.assertQueryBudget(reverse('quiz-create') + '?summary=1', 1)
+        self.assertNotIn('questions', self.client.get(reverse('quiz-create') + '?summary=1').data['results'][0])
+
+
+class CursorPaginationTests(QuizWhizTestCase):
+    def setUp(self):
+        self.user = self.create_user('creator')
+        self.authenticate(self.user)
+        self.quizzes = [self.create_quiz(self.user, questions=0) for _ in range(5)]
+        for quiz in self.quizzes:
+            self.create_submission(quiz, self.user)
+
+    def test_pages_are_newest_first_without_gaps(self):
+        ids, url = [], reverse('created-quizzes') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            ids += [quiz['id'] for quiz in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, [str(quiz.id) for quiz in reversed(self.quizzes)])
+
+    def test_tied_timestamps_page_on_id(self):
+        Quiz.objects.filter(creator=self.user).update(created_at=timezone.now())
+        expected = [str(quiz_id) for quiz_id in Quiz.objects.filter(creator=self.user).order_by('-id').values_list('id', flat=True)]
+
+        pages, url = [], reverse('created-quizzes') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            pages.append([quiz['id'] for quiz in response.data['results']])
+            url = response.data['next']
+        self.assertEqual(sum(pages, []), expected)
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([quiz['id'] for quiz in response.data['results']], pages[-2])
+
+    def test_invalid_position_is_not_found(self):
+        cursor = base64.b64encode(b'p=yesterday%7C1').decode()
+        response = self.client.get(reverse('created-quizzes'), {'cursor': cursor})
+        self.assertEqual(response.status_code, 404)
+
+    def test_dashboard_lists_page_independently(self):
+        response = self.client.get(reverse('user-quizzes') + '?page_size=2')
+        self.assertEqual(len(response.data['created']['results']), 2)
+
+        response = self.client.get(response.data['participated']['next'])
+        self.assertEqual(len(response.data['created']['results']), 2)
+        self.assertEqual(
+            [submission['quiz']['id'] for submission in response.data['participated']['results']],
+            [str(quiz.id) for quiz in reversed(self.quizzes)][2:4],
+        )
+
+
+class IsCreatorTests(QuizWhizTestCase):
+    def setUp(self):
+        self.creator = self.create_user('creator')
+        self.quiz = self.create_quiz(self.creator)
+        self.question = self.quiz.questions.first()
+        self.choice = self.question.choices.first()
+        self.url = reverse('choice-detail', args=[self.question.id, self.choice.id])
+
+    def test_ownership_is_resolved_once(self):
+        self.authenticate(self.creator)
+        # user, ownership, choice
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_other_users_are_rejected(self):
+        self.authenticate(self.create_user('intruder'))
+        with self.assertNumQueries(2):
+            response = self.client.patch(self.url, {'content': 'Changed'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_unknown_quiz_is_not_found(self):
+        self.authenticate(self.creator)
+        response = self.client.get(reverse('question-list-create', args=['00000000-0000-0000-0000-000000000000']))
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(QuizWhizTestCase):
+    def setUp(self):
+        self.creator = self.create_user('creator')
+        self.quiz = self.create_quiz(self.creator)
+        self.student = self.create_user('student')
+        self.submission = self.create_submission(self.quiz, self.student, answered=False)
+
+    def revalidate(self, url, queries):
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        return etag
+
+    def test_quiz_detail_revalidates_from_the_revision(self):
+        self.authenticate(self.creator)
+        url = reverse('quiz-detail', args=[self.quiz.id])
+        etag = self.revalidate(url, 1)
+
+        choice = Choice.objects.filter(question__quiz=self.quiz).first()
+        choice.content = 'Edited'
+        choice.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_questions_and_invitation_revalidate(self):
+        self.authenticate(self.student)
+        self.revalidate(reverse('show-quiz-question', args=[self.quiz.id, self.submission.id]), 1)
+        self.revalidate(reverse('join-quiz', args=[self.quiz.id]), 1)
+
+    def test_edits_invalidate_the_questions_snapshot(self):
+        url = reverse('show-quiz-question', args=[self.quiz.id, self.submission.id])
+        question = self.quiz.questions.order_by('id').first()
+        choice = question.choices.order_by('id').first()
+        edits = [
+            lambda: self.client.patch(reverse('quiz-detail', args=[self.quiz.id]), {'title': 'Renamed'}, format='json'),
+            lambda: self.client.patch(reverse('question-detail', args=[self.quiz.id, question.id]), {'content': 'Edited question'}, format='json'),
+            lambda: self.client.patch(reverse('choice-detail', args=[question.id, choice.id]), {'content': 'Edited choice'}, format='json'),
+        ]
+        etags = []
+        for edit in [None] + edits:
+            if edit:
+                self.authenticate(self.creator)
+                self.assertEqual(edit().status_code, 200)
+            self.authenticate(self.student)
+            response = self.client.get(url)
+            etags.append(response['ETag'])
+        self.assertEqual(len(set(etags)), len(etags))
+        first = json.loads(response.content)['questions'][0]
+        self.assertEqual((first['content'], first['choices'][0]['content']), ('Edited question', 'Edited choice'))
+
+    def test_saving_a_quiz_bumps_its_revision(self):
+        self.quiz.refresh_from_db()
+        revision = self.quiz.revision
+        self.quiz.title = 'Renamed'
+        self.quiz.save(update_fields=['title'])
+        self.assertEqual(self.quiz.revision, revision + 1)
+        stale = Quiz.objects.get(pk=self.quiz.pk)
+        self.quiz.save()
+        stale.save()
+        self.assertEqual((self.quiz.revision, stale.revision), (revision + 2, revision + 3))
+
+    def test_etag_depends_on_the_media_type(self):
+        self.authenticate(self.creator)
+        url = reverse('quiz-detail', args=[self.quiz.id])
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, HTTP_ACCEPT='text/html')['ETag'], etag)
+
+
+class RendererTests(QuizWhizTestCase):
+    def test_orjson_matches_the_drf_renderer(self):
+        data = {
+            'id': uuid.uuid4(),
+            'start_time': timezone.now(),
+            'duration': timedelta(minutes=30),
+            'score': Decimal('7.50'),
+            'answers': {1: 'a'},
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_questions_snapshot_follows_the_accept_header(self):
+        student = self.create_user('student')
+        quiz = self.create_quiz(self.create_user('creator'))
+        submission = self.create_submission(quiz, student, answered=False)
+        self.authenticate(student)
+        url = reverse('show-quiz-question', args=[quiz.id, submission.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(json.loads(response.content)['questions']), 3)
+        if msgpack is None:
+            self.assertEqual(self.client.get(url, HTTP_ACCEPT='application/msgpack').status_code, 406)
+        else:
+            response = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+            self.assertEqual(response['Content-Type'], 'application/msgpack')
+            self.assertEqual(len(msgpack.unpackb(response.content)['questions']), 3)
+
+
+class CachedAuthenticationTests(QuizWhizTestCase):
+    def setUp(self):
+        self.user = self.create_user('creator')
+        self.authenticate(self.user)
+
+    def test_user_is_loaded_once(self):
+        quiz = self.create_quiz(self.user, questions=0)
+        url = reverse('quiz-detail', args=[quiz.id])
+        self.client.get(url)
+        # ownership, quiz
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_profile_update_invalidates_the_cached_user(self):
+        self.client.get(reverse('profile'))
+        self.client.patch(reverse('profile'), {'name': 'Renamed'}, format='json')
+        self.assertEqual(self.client.get(reverse('profile')).data['name'], 'Renamed')
+
+    def test_deactivated_users_can_only_read(self):
+        quiz = self.create_quiz(self.user, questions=0)
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(reverse('quiz-create')).status_code, 200)
+        response = self.client.post(reverse('quiz-create'), {'title': 'Quiz', 'duration': '00:30:00', 'password': ''}, format='json')
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(reverse('join-quiz', args=[quiz.id]), {'password': ''}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_cache_is_bounded_and_expires(self):
+        cache = UserCache(maxsize=2, ttl=60)
+        for user_id in (1, 2, 3):
+            cache.set(user_id, user_id)
+        self.assertEqual([cache.get(user_id) for user_id in (1, 2, 3)], [None, 2, 3])
+
+        cache.ttl = 0
+        cache.set(4, 4)
+        self.assertIsNone(cache.get(4))
+
+
+class SubmissionWriteTests(QuizWhizTestCase):
+    def setUp(self):
+        self.quiz = self.create_quiz(self.create_user('creator'))
+        self.student = self.create_user('student')
+        self.authenticate(self.student)
+
+    def test_join_twice(self):
+        url = reverse('join-quiz', args=[self.quiz.id])
+        self.assertEqual(self.client.post(url).data['message'], 'Successfully joined the quiz')
+        self.assertEqual(self.client.post(url).data['message'], 'Already joined this quiz')
+        self.assertEqual(QuizSubmission.objects.filter(user=self.student).count(), 1)
+
+    def test_answer_twice(self):
+        submission = self.create_submission(self.quiz, self.student, answered=False)
+        question = self.quiz.questions.first()
+        url = reverse('submit-answer', args=[self.quiz.id, submission.id])
+        data = {'question': question.id, 'choice': question.correct_choice_id}
+
+        self.assertEqual(self.client.post(url, data, format='json').status_code, 200)
+        self.assertEqual(self.client.post(url, data, format='json').status_code, 409)
+
+        submission.refresh_from_db()
+        self.assertEqual((submission.answered_count, submission.correct_count, submission.score), (1, 1, 1))
+
+
+class RosterTests(QuizWhizTestCase):
+    def setUp(self):
+        self.creator = self.create_user('creator')
+        self.quiz = self.create_quiz(self.creator, questions=1)
+        self.students = [self.create_user(f'student{i}') for i in range(3)]
+        self.url = reverse('quiz-roster', args=[self.quiz.id])
+        self.authenticate(self.creator)
+
+    def register(self, emails):
+        return self.client.post(self.url, {'emails': emails}, format='json')
+
+    def test_roster_is_registered_once(self):
+        emails = [student.email for student in self.students[:2]] + ['nobody@example.com']
+        response = self.register(emails)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['registered'], response.data['unknown']), (sorted(emails[:2]), ['nobody@example.com']))
+
+        self.register([student.email for student in self.students])
+        self.assertEqual(QuizSubmission.objects.filter(quiz=self.quiz).count(), 3)
+
+    def test_query_count_does_not_grow_with_the_roster(self):
+        self.register([self.students[0].email])
+        counts = []
+        for students in (self.students[:1], self.students):
+            QuizSubmission.objects.filter(quiz=self.quiz).delete()
+            with CaptureQueriesContext(connection) as queries:
+                self.register([student.email for student in students])
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_invalid_rosters_and_other_users_are_refused(self):
+        self.assertEqual(self.register([]).status_code, 400)
+        self.assertEqual(self.register(['not-an-email']).status_code, 400)
+        self.authenticate(self.students[0])
+        self.assertEqual(self.register([self.students[0].email]).status_code, 403)
+
+
+class StartSubmissionTests(QuizWhizTestCase):
+    def setUp(self):
+        self.quiz = self.create_quiz(self.create_user('creator'), questions=1)
+        self.student = self.create_user('student')
+        self.submission = self.create_submission(self.quiz, self.student, answered=False)
+        self.url = reverse('start-submission-session', args=[self.quiz.id, self.submission.id])
+        self.authenticate(self.student)
+
+    def test_start_is_one_conditional_update(self):
+        get_quiz_duration(self.quiz.id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        statements = [query['sql'] for query in queries if 'quiz_quizsubmission' in query['sql'] or '"quiz_quiz"' in query['sql']]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('UPDATE'))
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.state, 'in_progress')
+        self.assertEqual(self.submission.end_at - self.submission.started_at, self.quiz.duration)
+        self.assertEqual(response.data['end_at'], self.submission.end_at)
+
+    def test_starting_again_keeps_the_first_start(self):
+        self.client.post(self.url)
+        self.submission.refresh_from_db()
+        started_at = self.submission.started_at
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 400)
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.started_at, started_at)
+
+    def test_other_users_cannot_start(self):
+        self.authenticate(self.create_user('intruder'))
+        self.assertEqual(self.client.post(self.url).status_code, 404)
+        self.submission.refresh_from_db()
+        self.assertIsNone(self.submission.started_at)
+
+
+class AnswerCounterTests(QuizWhizTestCase):
+    def setUp(self):
+        self.quiz = self.create_quiz(self.create_user('creator'), questions=3)
+        self.questions = list(self.quiz.questions.order_by('id'))
+        self.student = self.create_user('student')
+        self.submission = self.create_submission(self.quiz, self.student, answered=False)
+        self.authenticate(self.student)
+
+    def answer(self, question, choice):
+        url = reverse('submit-answer', args=[self.quiz.id, self.submission.id])
+        return self.client.post(url, {'question': question.id, 'choice': choice.id}, format='json')
+
+    def progress(self):
+        return self.client.get(reverse('submission-progress', args=[self.quiz.id, self.submission.id]))
+
+    def test_counters_follow_answer_writes(self):
+        self.answer(self.questions[0], self.questions[0].correct_choice)
+        self.answer(self.questions[1], self.questions[1].choices.order_by('id').last())
+        self.answer(self.questions[1], self.questions[1].correct_choice)
+
+        self.submission.refresh_from_db()
+        self.assertEqual((self.submission.answered_count, self.submission.correct_count, self.submission.score), (2, 1, 1))
+
+    def test_counters_are_incremented_in_the_database(self):
+        stale = QuizSubmission.objects.get(pk=self.submission.pk)
+        record_answers(self.submission.pk, answered=2, correct=1)
+        record_answers(stale.pk, answered=1, correct=1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.answered_count, stale.correct_count, stale.score), (3, 2, 2))
+
+    def test_progress_reads_one_row(self):
+        self.answer(self.questions[0], self.questions[0].correct_choice)
+        self.progress()
+        with self.assertNumQueries(1):
+            response = self.progress()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: response.data[key] for key in ('answered_count', 'question_count', 'correct_count', 'score')},
+            {'answered_count': 1, 'question_count': 3, 'correct_count': 1, 'score': '1.00'},
+        )
+
+    def test_progress_of_other_users_is_not_found(self):
+        self.authenticate(self.create_user('intruder'))
+        self.assertEqual(self.progress().status_code, 404)
+
+
+class BatchSubmissionTests(QuizWhizTestCase):
+    def setUp(self):
+        self.quiz = self.create_quiz(self.create_user('creator'), questions=5)
+        self.questions = list(self.quiz.questions.order_by('id'))
+        self.student = self.create_user('student')
+        self.submission = self.create_submission(self.quiz, self.student, answered=False)
+        self.url = reverse('submit-answer-batch', args=[self.quiz.id, self.submission.id])
+        self.authenticate(self.student)
+
+    def submit(self, questions):
+        answers = [{'question': question.id, 'choice': question.correct_choice_id} for question in questions]
+        return self.client.post(self.url, {'answers': answers}, format='json')
+
+    def test_answered_questions_are_skipped(self):
+        single = reverse('submit-answer', args=[self.quiz.id, self.submission.id])
+        self.client.post(single, {'question': self.questions[0].id, 'choice': self.questions[0].correct_choice_id}, format='json')
+
+        response = self.submit(self.questions[:3])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['submitted'], response.data['already_answered']), ([q.id for q in self.questions[1:3]], [self.questions[0].id]))
+        self.submission.refresh_from_db()
+        self.assertEqual((self.submission.answered_count, self.submission.correct_count), (3, 3))
+
+    def test_invalid_answers_save_nothing(self):
+        answers = [
+            {'question': self.questions[0].id, 'choice': self.questions[0].correct_choice_id},
+            {'question': self.questions[1].id, 'choice': self.questions[0].correct_choice_id},
+            {'question': 0, 'choice': 1},
+            {'question': self.questions[0].id, 'choice': self.questions[0].correct_choice_id},
+        ]
+        response = self.client.post(self.url, {'answers': answers}, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['answers']
+        self.assertEqual((errors[0], list(errors[1]), list(errors[2]), list(errors[3])), ({}, ['choice'], ['question'], ['question']))
+        self.assertFalse(Answer.objects.filter(submission=self.submission).exists())
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        self.submit(self.questions[:1])
+        counts = []
+        for questions in (self.questions[1:2], self.questions[2:]):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.submit(questions).status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_finished_or_overdue_submissions_are_refused(self):
+        for changes in ({'state': 'expired'}, {'state': 'in_progress', 'end_at': timezone.now() - timedelta(seconds=1)}):
+            QuizSubmission.objects.filter(pk=self.submission.pk).update(**changes)
+            self.assertEqual(self.submit(self.questions[:1]).status_code, 403)
+            single = reverse('submit-answer', args=[self.quiz.id, self.submission.id])
+            response = self.client.put(single, {'question': self.questions[0].id, 'choice': self.questions[0].correct_choice_id}, format='json')
+            self.assertEqual(response.status_code, 403)
+        self.assertFalse(Answer.objects.filter(submission=self.submission).exists())
+
+    def test_concurrent_answer_is_skipped_on_retry(self):
+        save_answers = QuizSubmissionBatchView.save_answers
+        attempts = []
+
+        def conflict_once(view, submission_id, answers, answer_key):
+            attempts.append(len(attempts))
+            if len(attempts) == 1:
+                raise IntegrityError('UNIQUE constraint failed')
+            return save_answers(view, submission_id, answers, answer_key)
+
+        with mock.patch.object(QuizSubmissionBatchView, 'save_answers', conflict_once):
+            response = self.submit(self.questions[:2])
+        self.assertEqual((response.status_code, len(attempts)), (200, 2))
+        self.assertEqual(Answer.objects.filter(submission=self.submission).count(), 2)
+
+
+class ResumeSubmissionTests(QuizWhizTestCase):
+    def setUp(self):
+        self.quiz = self.create_quiz(self.create_user('creator'))
+        self.student = self.create_user('student')
+        self.submission = self.create_submission(self.quiz, self.student, answered=False)
+        self.question = self.quiz.questions.order_by('id').first()
+        Answer.objects.create(submission=self.submission, question=self.question, choice=self.question.correct_choice, is_correct=True)
+        self.url = reverse('resume-submission', args=[self.quiz.id, self.submission.id])
+        self.authenticate(self.student)
+
+    def test_one_request_rebuilds_the_exam(self):
+        # submission, answers, questions snapshot
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        data = json.loads(response.content)
+
+        self.assertEqual((data['submission']['id'], data['submission']['state']), (str(self.submission.id), 'not_started'))
+        self.assertEqual(data['answers'], [{'question': self.question.id, 'choice': self.question.correct_choice_id, 'text': ''}])
+        self.assertEqual(len(data['quiz']['questions']), 3)
+        self.assertNotIn('correct_choice', data['quiz']['questions'][0])
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_includes_journaled_answers(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        journal = AnswerJournal(Path(directory.name) / 'answers.journal').open()
+        self.addCleanup(journal.close)
+        second = self.quiz.questions.order_by('id')[1]
+        journal.append(self.submission.id, [(second.id, second.correct_choice_id)])
+
+        with mock.patch('quiz.views.get_journal', return_value=journal):
+            data = json.loads(self.client.get(self.url).content)
+        self.assertEqual([answer['question'] for answer in data['answers']], [self.question.id, second.id])
+        self.assertEqual(data['submission']['answered_count'], 1)
+
+    def test_other_users_cannot_resume(self):
+        self.authenticate(self.create_user('intruder'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class IdempotentAnswerTests(QuizWhizTestCase):
+    def setUp(self):
+        self.quiz = self.create_quiz(self.create_user('creator'))
+        self.student = self.create_user('student')
+        self.submission = self.create_submission(self.quiz, self.student, answered=False)
+        self.question = self.quiz.questions.order_by('id').first()
+        self.right, self.wrong = self.question.choices.order_by('id')[:2]
+        self.url = reverse('submit-answer', args=[self.quiz.id, self.submission.id])
+        self.authenticate(self.student)
+
+    def answer(self, method, choice, key=None, **extra):
+        if key:
+            extra['HTTP_IDEMPOTENCY_KEY'] = key
+        return getattr(self.client, method)(self.url, {'question': self.question.id, 'choice': choice.id}, format='json', **extra)
+
+    def test_retries_replay_the_stored_response(self):
+        first = self.answer('post', self.right, key='attempt-1')
+        with self.assertNumQueries(0):
+            retry = self.answer('post', self.right, key='attempt-1')
+
+        self.assertEqual((retry.status_code, retry.data), (first.status_code, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Answer.objects.filter(submission=self.submission).count(), 1)
+        self.assertEqual(self.answer('post', self.wrong, key='attempt-1').status_code, 422)
+        self.assertEqual(self.answer('post', self.right, key='attempt-2').status_code, 409)
+
+    def test_put_changes_the_answer(self):
+        self.assertTrue(self.answer('put', self.right).data['changed'])
+        self.assertFalse(self.answer('put', self.right).data['changed'])
+        self.assertTrue(self.answer('put', self.wrong).data['changed'])
+
+        answer = Answer.objects.get(submission=self.submission)
+        self.assertEqual((answer.choice, answer.is_correct), (self.wrong, False))
+        self.submission.refresh_from_db()
+        self.assertEqual((self.submission.answered_count, self.submission.correct_count, self.submission.score), (1, 0, 0))
+        stats = dict(ChoiceStats.objects.values_list('choice', 'answer_count'))
+        self.assertEqual((stats[self.right.id], stats[self.wrong.id]), (0, 1))
+
+    def test_upsert_writes_each_table_once_and_reads_nothing_first(self):
+        self.answer('put', self.right)
+        answer = build_answer(self.submission.id, self.question.id, {'type': 'mcq', 'correct_choice': self.right.id}, self.wrong.id)
+        with CaptureQueriesContext(connection) as queries, transaction.atomic():
+            self.assertTrue(upsert_answer(answer))
+        statements = [query['sql'].split()[0] for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(statements, ['UPDATE', 'UPDATE', 'INSERT'])
+
+    def test_retry_while_the_first_request_runs_is_refused(self):
+        retries = []
+
+        def retry_during_upsert(answer):
+            retries.append(self.answer('put', self.right, key='in-flight'))
+            return upsert_answer(answer)
+
+        with mock.patch('quiz.views.upsert_answer', side_effect=retry_during_upsert):
+            first = self.answer('put', self.right, key='in-flight')
+        self.assertEqual((first.status_code, retries[0].status_code), (200, 409))
+        self.assertEqual(self.answer('put', self.right, key='in-flight')['Idempotent-Replayed'], 'true')
+
+
+class ExpireSubmissionsTests(QuizWhizTestCase):
+    def test_overdue_submissions_are_expired_in_batches(self):
+        quiz = self.create_quiz(self.create_user('creator'), questions=0)
+        now = timezone.now()
+        started_at = now - timedelta(minutes=30)
+        overdue = [
+            QuizSubmission.objects.create(
+                quiz=quiz, user=self.create_user(f'late{i}'), state='in_progress',
+                started_at=started_at, end_at=now - timedelta(minutes=5),
+            )
+            for i in range(3)
+        ]
+        running = QuizSubmission.objects.create(
+            quiz=quiz, user=self.create_user('running'), state='in_progress',
+            started_at=started_at, end_at=now + timedelta(minutes=5),
+        )
+
+        self.assertEqual(expire_submissions(batch_size=2), 3)
+        self.assertEqual(expire_submissions(), 0)
+
+        for submission in overdue:
+            submission.refresh_from_db()
+            self.assertEqual(submission.state, 'expired')
+            self.assertEqual(submission.finished_at, submission.end_at)
+            self.assertEqual(submission.time_spent, 25 * 60)
+        running.refresh_from_db()
+        self.assertEqual(running.state, 'in_progress')
+
+
+class AnswerJournalTests(QuizWhizTestCase):
+    def setUp(self):
+        self.quiz = self.create_quiz(self.create_user('creator'))
+        self.submission = self.create_submission(self.quiz, self.create_user('student'), answered=False)
+        self.questions = list(self.quiz.questions.all())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'answers.journal'
+
+    def test_duplicates_are_detected_before_and_after_flush(self):
+        journal = AnswerJournal(self.path).open()
+        self.addCleanup(journal.close)
+        first, second = self.questions[:2]
+
+        self.assertEqual(journal.append(self.submission.id, [(first.id, first.correct_choice_id)]), set())
+        self.assertEqual(journal.append(self.submission.id, [(first.id, first.correct_choice_id)]), {first.id})
+        self.assertFalse(Answer.objects.exists())
+
+        self.assertEqual(journal.flush(), 1)
+        self.assertEqual(journal.append(self.submission.id, [(first.id, first.correct_choice_id), (second.id, second.correct_choice_id)]), {first.id})
+        self.assertEqual(journal.pending_answers(self.submission.id), {second.id: second.correct_choice_id})
+
+    def test_unflushed_answers_are_replayed(self):
+        journal = AnswerJournal(self.path).open()
+        journal.append(self.submission.id, [(question.id, question.correct_choice_id) for question in self.questions[:2]])
+        # Crash: the process dies in the middle of the next write.
+        journal.file.write(b'{"submission": "')
+        journal.file.close()
+
+        journal = AnswerJournal(self.path).open()
+        self.addCleanup(journal.close)
+        self.assertEqual(Answer.objects.filter(submission=self.submission).count(), 2)
+        self.assertEqual(self.path.stat().st_size, 0)
+        self.submission.refresh_from_db()
+        self.assertEqual((self.submission.answered_count, self.submission.correct_count, self.submission.score), (2, 2, 2))
+
+    def test_essays_bypass_the_journal(self):
+        journal = AnswerJournal(self.path).open()
+        self.addCleanup(journal.close)
+        essay = Question.objects.create(quiz=self.quiz, content='Essay', type='essay')
+        question = self.questions[0]
+        self.authenticate(self.submission.user)
+        answers = [{'question': question.id, 'choice': question.correct_choice_id}, {'question': essay.id, 'text': 'Because.'}]
+        with mock.patch('quiz.views.get_journal', return_value=journal):
+            response = self.client.post(reverse('submit-answer-batch', args=[self.quiz.id, self.submission.id]), {'answers': answers}, format='json')
+
+        self.assertEqual(response.data['submitted'], [question.id, essay.id])
+        self.assertEqual(journal.pending_answers(self.submission.id), {question.id: question.correct_choice_id})
+        self.assertEqual(Answer.objects.get(submission=self.submission).text, 'Because.')
+
+
+class LiveHubTests(QuizWhizTestCase):
+    def setUp(self):
+        self.quiz = self.create_quiz(self.create_user('creator'), questions=0)
+        self.submissions = [self.create_submission(self.quiz, self.create_user(f'student{i}'), answered=False) for i in range(2)]
+        QuizSubmission.objects.filter(pk=self.submissions[0].pk).update(state='in_progress', end_at=timezone.now() + timedelta(minutes=5))
+        self.hub = LiveHub(poll_interval=60)
+
+    def test_one_query_fans_out_to_every_subscriber(self):
+        first, second = (submission.pk for submission in self.submissions)
+
+        async def listen():
+            queues = [self.hub.subscribe(self.quiz.pk, first), self.hub.subscribe(self.quiz.pk, first), self.hub.subscribe(self.quiz.pk, second)]
+            received = [[await asyncio.wait_for(queue.get(), 1) for _ in range(2)] for queue in queues]
+            for queue, submission_id in zip(queues, (first, first, second)):
+                self.hub.unsubscribe(self.quiz.pk, submission_id, queue)
+            return received
+
+        with CaptureQueriesContext(connection) as queries:
+            received = async_to_sync(listen)()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(received[0], received[1])
+        self.assertEqual([event for event, _ in received[0]], ['deadline', 'state'])
+        self.assertEqual(received[0][1][1], {'state': 'in_progress'})
+        self.assertEqual(received[2], [('deadline', {'end_at': None}), ('state', {'state': 'not_started'})])
+        self.assertEqual(self.hub.channels, {})
+
+    def test_expiry_is_pushed_once(self):
+        channel = QuizChannel(self.quiz.pk)
+        queue = asyncio.Queue()
+        channel.subscribers[self.submissions[0].pk].add(queue)
+        end_at = timezone.now()
+        for _ in range(2):
+            self.hub.publish(channel, [(self.submissions[0].pk, 'in_progress', end_at)], end_at + timedelta(seconds=1))
+        events = [queue.get_nowait()[0] for _ in range(queue.qsize())]
+        self.assertEqual(events, ['deadline', 'state', 'expired'])
+
+    def test_client_disconnect_unsubscribes(self):
+        submission_id = self.submissions[0].pk
+
+        async def disconnect_after_first_event():
+            stream = self.hub.stream(self.quiz.pk, submission_id, heartbeat=1)
+            first = await stream.__anext__()
+            task = self.hub.channels[self.quiz.pk].task
+            # The ASGI handler closes the response iterator when the client goes away.
+            await stream.aclose()
+            await asyncio.sleep(0)
+            return first, task
+
+        first, task = async_to_sync(disconnect_after_first_event)()
+        self.assertTrue(first.startswith('event: deadline\n'))
+        self.assertEqual(self.hub.channels, {})
+        self.assertTrue(task.cancelled())
+
+
+class HistogramTests(SimpleTestCase):
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.samples()), [(1, 2), (5, 3), ('+Inf', 4)])
+        self.assertEqual((histogram.sum, histogram.count), (14, 4))
+
+    def test_exposition_format(self):
+        metrics = MetricsRegistry()
+        metrics.observe((('method', 'GET'), ('route', 'a"b')), quizwhiz_request_queries=2)
+        lines = metrics.render().splitlines()
+        self.assertIn('# TYPE quizwhiz_request_queries histogram', lines)
+        self.assertIn('quizwhiz_request_queries_bucket{method="GET",route="a\\"b",le="1"} 0', lines)
+        self.assertIn('quizwhiz_request_queries_bucket{method="GET",route="a\\"b",le="+Inf"} 1', lines)
+        self.assertIn('quizwhiz_request_queries_count{method="GET",route="a\\"b"} 1', lines)
+
+
+class PerformanceMiddlewareTests(QuizWhizTestCase):
+    def setUp(self):
+        self.user = self.create_user('creator')
+        self.create_quiz(self.user)
+        self.authenticate(self.user)
+        self.token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+
+    def test_server_timing_and_histograms(self):
+        with mock.patch.object(registry, 'observe') as observe:
+            response = self.client.get(reverse('created-quizzes'))
+
+        phases = dict(part.split(';', 1)[0:2] for part in response['Server-Timing'].split(', '))
+        self.assertEqual(list(phases), ['db', 'serialize', 'renderer', 'view', 'total'])
+        self.assertIn('desc="1 queries"', phases['db'])
+        labels, values = observe.call_args.args[0], observe.call_args.kwargs
+        self.assertEqual(labels, (('method', 'GET'), ('route', 'api/v1/quiz/created/')))
+        self.assertEqual(values['quizwhiz_request_queries'], 1)
+        self.assertGreater(values['quizwhiz_request_serializer_seconds'], 0)
+        self.assertGreater(values['quizwhiz_request_renderer_seconds'], 0)
+        self.assertGreaterEqual(values['quizwhiz_request_duration_seconds'], values['quizwhiz_request_db_seconds'])
+
+    async def test_async_requests_are_timed(self):
+        with mock.patch.object(registry, 'observe') as observe:
+            response = await self.async_client.get(reverse('created-quizzes'), headers={'authorization': f'Bearer {self.token}'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+        self.assertGreater(observe.call_args.kwargs['quizwhiz_request_serializer_seconds'], 0)
+
+    def test_metrics_are_restricted(self):
+        self.client.get(reverse('created-quizzes'))
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'route="api/v1/quiz/created/"', response.content)
+
+        with override_settings(METRICS_ALLOWED_IPS=[]):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.client.force_login(CustomUser.objects.create_user(username='ops', email='ops@example.com', password='password', is_staff=True))
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+@mock.patch('quizwhiz.routers.replica_alias', return_value='replica')
+class ReplicaRoutingTests(SimpleTestCase):
+    def route(self, method, view):
+        """Databases of a read, then a read after a write, inside a request to `view`."""
+        router = ReplicaRouter()
+        routes = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            routes.append(router.db_for_read(Quiz))
+            router.db_for_write(Quiz)
+            routes.append(router.db_for_read(Quiz))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        middleware(getattr(RequestFactory(), method)('/'))
+        return routes
+
+    def test_marked_views_read_from_the_replica_until_they_write(self, replica_alias):
+        self.assertEqual(self.route('get', CreatedQuizzesView.as_view()), ['replica', None])
+
+    def test_unsafe_requests_use_the_primary(self, replica_alias):
+        self.assertEqual(self.route('post', CreatedQuizzesView.as_view()), [None, None])
+
+    def test_unmarked_views_use_the_primary(self, replica_alias):
+        self.assertEqual(self.route('get', QuizCreateView.as_view()), [None, None])
+
+    def test_queries_outside_requests_use_the_primary(self, replica_alias):
+        self.assertIsNone(ReplicaRouter().db_for_read(Quiz))
+
+    def test_async_requests_route_sync_code(self, replica_alias):
+        router = ReplicaRouter()
+        routes = []
+        view = CreatedQuizzesView.as_view()
+
+        def sync_view(request):
+            routes.append(router.db_for_read(Quiz))
+            router.db_for_write(Quiz)
+
+        async def get_response(request):
+            await sync_to_async(middleware.process_view)(request, view, (), {})
+            await sync_to_async(sync_view)(request)
+            routes.append(router.db_for_read(Quiz))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertEqual(routes, ['replica', None])
+
+
+class EssayReviewTests(QuizWhizTestCase):
+    def setUp(self):
+        self.creator = self.create_user('creator')
+        self.quiz = self.create_quiz(self.creator, questions=1)
+        self.mcq = self.quiz.questions.get()
+        self.essays = [Question.objects.create(quiz=self.quiz, content=f'Essay {i}', type='essay') for i in range(2)]
+        self.submissions = []
+        for i in range(3):
+            student = self.create_user(f'student{i}')
+            submission = self.create_submission(self.quiz, student, answered=False)
+            self.authenticate(student)
+            answers = [{'question': self.mcq.id, 'choice': self.mcq.correct_choice_id}]
+            answers += [{'question': essay.id, 'text': f'Answer of {student.name}'} for essay in self.essays]
+            response = self.client.post(reverse('submit-answer-batch', args=[self.quiz.id, submission.id]), {'answers': answers}, format='json')
+            self.assertEqual(response.status_code, 200)
+            self.submissions.append(submission)
+        self.authenticate(self.creator)
+
+    def claim(self, **data):
+        response = self.client.post(reverse('review-claim', args=[self.quiz.id]), data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def grade(self, lease, grades):
+        data = {'lease': lease, 'grades': [{'answer': answer, 'is_correct': verdict} for answer, verdict in grades.items()]}
+        return self.client.post(reverse('review-grade', args=[self.quiz.id]), data, format='json').data
+
+    def test_essays_wait_for_review(self):
+        answer = Answer.objects.get(submission=self.submissions[0], question=self.essays[0])
+        self.assertEqual((answer.text, answer.choice_id, answer.is_correct, answer.needs_review), ('Answer of Student0', None, None, True))
+        self.submissions[0].refresh_from_db()
+        self.assertEqual((self.submissions[0].answered_count, self.submissions[0].score), (3, 1))
+
+        student = self.create_user('late')
+        submission = self.create_submission(self.quiz, student, answered=False)
+        self.authenticate(student)
+        response = self.client.post(reverse('submit-answer', args=[self.quiz.id, submission.id]), {'question': self.essays[0].id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_concurrent_claims_never_overlap(self):
+        first = self.claim(limit=4)
+        second = self.claim(limit=4)
+        self.assertEqual(len(first['answers']), 4)
+        self.assertEqual(len(second['answers']), 2)
+        self.assertFalse({answer['id'] for answer in first['answers']} & {answer['id'] for answer in second['answers']})
+        self.assertEqual(self.claim()['answers'], [])
+
+        # Expired leases go back to the queue.
+        later = timezone.now() + timedelta(hours=1)
+        lease, _, claimed = claim_answers(self.quiz.id, 10, now=later)
+        self.assertEqual(len(claimed), 6)
+
+    def test_claim_one_question(self):
+        answers = self.claim(question=self.essays[1].id)['answers']
+        self.assertEqual({answer['question'] for answer in answers}, {self.essays[1].id})
+
+    def test_grades_rescore_only_the_touched_submissions(self):
+        QuizSubmission.objects.filter(pk__in=[submission.pk for submission in self.submissions]).update(state='pending_review')
+        claimed = self.claim(limit=6)
+        first = [answer['id'] for answer in claimed['answers'] if answer['submission'] == self.submissions[0].id]
+
+        self.assertEqual(self.grade(uuid.uuid4(), {first[0]: True})['graded'], [])
+        response = self.grade(claimed['lease'], {answer: True for answer in first})
+        self.assertEqual(response['graded'], sorted(first))
+
+        states = dict(QuizSubmission.objects.values_list('pk', 'state'))
+        scores = dict(QuizSubmission.objects.values_list('pk', 'score'))
+        self.assertEqual((states[self.submissions[0].pk], scores[self.submissions[0].pk]), ('reviewed', 3))
+        self.assertEqual((states[self.submissions[1].pk], scores[self.submissions[1].pk]), ('pending_review', 1))
+        self.assertEqual(self.grade(claimed['lease'], {first[0]: False})['rejected'], [first[0]])
+
+    def test_expired_submissions_with_essays_wait_for_review(self):
+        QuizSubmission.objects.filter(pk=self.submissions[0].pk).update(state='in_progress', started_at=timezone.now(), end_at=timezone.now())
+        expire_submissions(now=timezone.now() + timedelta(seconds=1))
+        self.submissions[0].refresh_from_db()
+        self.assertEqual(self.submissions[0].state, 'pending_review')
+
+    def test_only_the_creator_reviews(self):
+        self.authenticate(self.create_user('intruder'))
+        self.assertEqual(self.client.post(reverse('review-claim', args=[self.quiz.id]), {}, format='json').status_code, 403)
+
+
+class GradingTests(QuizWhizTestCase):
+    def setUp(self):
+        self.creator = self.create_user('creator')
+        self.quiz = self.create_quiz(self.creator, questions=3)
+        self.questions = list(self.quiz.questions.order_by('id'))
+        self.submissions = [self.create_submission(self.quiz, self.create_user(f'student{i}')) for i in range(2)]
+        # The second student got the last question wrong.
+        last = self.questions[-1]
+        Answer.objects.filter(submission=self.submissions[1], question=last).update(
+            choice=last.choices.order_by('id').last(), is_correct=True,
+        )
+        self.authenticate(self.creator)
+
+    def scores(self):
+        return [
+            (submission.score, submission.score_before_regrade)
+            for submission in QuizSubmission.objects.filter(quiz=self.quiz).order_by('joined_at', 'id')
+        ]
+
+    def test_grade_quiz(self):
+        self.assertEqual(grade_quiz(self.quiz.id), 2)
+        self.assertEqual(self.scores(), [(3, None), (2, None)])
+        self.assertEqual(Answer.objects.filter(is_correct=False).count(), 1)
+
+    def test_changing_the_key_regrades_only_that_question(self):
+        grade_quiz(self.quiz.id)
+        last = self.questions[-1]
+        url = reverse('question-detail', args=[self.quiz.id, last.id])
+        with mock.patch('quiz.grading.mark_answers', wraps=mark_answers) as marked:
+            response = self.client.patch(url, {'correct_choice': last.choices.order_by('id').last().id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(marked.call_args.args[0].values_list('question', flat=True)), {last.id})
+        self.assertEqual(self.scores(), [(2, 3), (3, 2)])
+
+    def test_first_score_is_kept_across_regrades(self):
+        grade_quiz(self.quiz.id)
+        last = self.questions[-1]
+        for choice in (last.choices.order_by('id').last(), last.choices.order_by('id').first()):
+            last.correct_choice = choice
+            last.save()
+            regrade_question(last)
+        self.assertEqual(self.scores(), [(3, 3), (2, 2)])
+
+    def test_keep_score_before_regrade_skips_ungraded_submissions(self):
+        submissions = QuizSubmission.objects.filter(quiz=self.quiz)
+        keep_score_before_regrade(submissions)
+        self.assertEqual(self.scores(), [(None, None), (None, None)])
+
+    def test_question_turned_into_an_essay_goes_to_review(self):
+        grade_quiz(self.quiz.id)
+        rebuild_choice_stats(self.quiz.id)
+        QuizSubmission.objects.filter(quiz=self.quiz).update(state='expired')
+        first = self.questions[0]
+        response = self.client.patch(reverse('question-detail', args=[self.quiz.id, first.id]), {'type': 'essay'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        answers = Answer.objects.filter(question=first)
+        self.assertEqual(set(answers.values_list('choice', 'text', 'is_correct', 'needs_review')), {(None, 'Choice 0', None, True)})
+        self.assertEqual(self.scores(), [(2, 3), (1, 2)])
+        self.assertEqual(set(QuizSubmission.objects.filter(quiz=self.quiz).values_list('state', flat=True)), {'pending_review'})
+        self.assertEqual(ChoiceStats.objects.get(choice=first.choices.order_by('id').first()).answer_count, 0)
+
+        # Grading the whole quiz again leaves the reviewed essays alone.
+        lease, _, claimed = claim_answers(self.quiz.id, limit=10)
+        self.client.post(
+            reverse('review-grade', args=[self.quiz.id]),
+            {'lease': lease, 'grades': [{'answer': answer, 'is_correct': True} for answer in claimed]},
+            format='json',
+        )
+        grade_quiz(self.quiz.id, regrade=True)
+        self.assertEqual(self.scores(), [(3, 3), (2, 2)])
+        self.assertEqual(set(QuizSubmission.objects.filter(quiz=self.quiz).values_list('state', flat=True)), {'reviewed'})
+
+    def test_grade_quiz_command(self):
+        grade_quiz(self.quiz.id)
+        out = io.StringIO()
+        call_command('grade_quiz', str(self.quiz.id), '--regrade', stdout=out)
+        self.assertIn('Graded 2 submissions', out.getvalue())
+        self.assertEqual(self.scores(), [(3, 3), (2, 2)])
+
+        with self.assertRaisesMessage(CommandError, 'does not exist'):
+            call_command('grade_quiz', 'not-a-quiz')
+
+
+class QuizCommandTests(QuizWhizTestCase):
+    def test_unknown_quizzes_are_refused(self):
+        for quiz_id in ('not-a-quiz', str(uuid.uuid4())):
+            for command, *args in (('grade_quiz',), ('rebuild_analytics',), ('import_questions', 'bank.json')):
+                with self.subTest(command=command, quiz_id=quiz_id), self.assertRaisesMessage(CommandError, f'Quiz "{quiz_id}" does not exist'):
+                    call_command(command, quiz_id, *args)
+
+
+class LoadTestCommandTests(SimpleTestCase):
+    def test_report(self):
+        # In a separate process: the command sets up its own test database.
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'report.json'
+            subprocess.run(
+                [sys.executable, 'manage.py', 'loadtest', '--creators', '1', '--quizzes', '1', '--questions', '2',
+                 '--choices', '2', '--participants', '2', '--workers', '2', '--output', str(output)],
+                cwd=settings.BASE_DIR, check=True, capture_output=True,
+            )
+            report = json.loads(output.read_text())
+
+        self.assertEqual(list(report), ['config', 'duration_seconds', 'requests', 'throughput', 'endpoints'])
+        self.assertEqual(list(report['endpoints']), ['join', 'start', 'questions', 'submit', 'dashboard'])
+        self.assertEqual(report['requests'], 12)
+        for stats in report['endpoints'].values():
+            self.assertEqual(list(stats), ['requests', 'errors', 'throughput', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_mean', 'queries_max'])
+            self.assertEqual(stats['errors'], 0)
+
+
+class QuizAnalyticsTests(QuizWhizTestCase):
+    def setUp(self):
+        self.creator = self.create_user('creator')
+        self.quiz = self.create_quiz(self.creator, questions=2)
+        self.questions = list(self.quiz.questions.order_by('id'))
+        for name, right in (('first', True), ('second', False)):
+            student = self.create_user(name)
+            submission = self.create_submission(self.quiz, student, answered=False)
+            self.authenticate(student)
+            answers = [
+                {'question': question.id, 'choice': question.correct_choice_id if right else question.choices.last().id}
+                for question in self.questions
+            ]
+            self.client.post(reverse('submit-answer-batch', args=[self.quiz.id, submission.id]), {'answers': answers}, format='json')
+        self.authenticate(self.creator)
+
+    def test_statistics_follow_answer_writes(self):
+        # user, ownership, choices, score histogram
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('quiz-analytics', args=[self.quiz.id]))
+        question = response.data['questions'][0]
+        self.assertEqual((question['answer_count'], question['correct_count'], question['correct_rate']), (2, 1, 0.5))
+        self.assertEqual([choice['answer_count'] for choice in question['choices']], [1, 0, 1])
+        self.assertEqual(response.data['score_histogram'], [{'score': 0, 'submissions': 1}, {'score': 2, 'submissions': 1}])
+
+    def test_answers_only_update_the_statistics(self):
+        question = self.questions[0]
+        submission = self.create_submission(self.quiz, self.create_user('third'), answered=False)
+        self.authenticate(submission.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('submit-answer', args=[self.quiz.id, submission.id]), {'question': question.id, 'choice': question.correct_choice_id}, format='json')
+        stats = [query['sql'] for query in queries if 'quiz_choicestats' in query['sql']]
+        self.assertEqual(len(stats), 1)
+        self.assertTrue(stats[0].startswith('UPDATE'))
+
+    def test_every_new_choice_has_statistics(self):
+        question = self.questions[0]
+        self.client.post(reverse('choice-list-create', args=[question.id]), {'content': 'Added'}, format='json')
+        self.client.post(reverse('clone-quiz', args=[self.quiz.id]), format='json')
+        self.client.post(
+            reverse('quiz-import', args=[self.quiz.id]),
+            json.dumps([{'content': 'Imported', 'choices': ['A', 'B'], 'correct_choice': 0}]),
+            content_type='application/json',
+        )
+        self.assertEqual(Choice.objects.filter(stats__isnull=True).count(), 0)
+        self.assertEqual(Choice.objects.count(), 7 + 7 + 2)
+
+    def test_essay_answers_are_counted(self):
+        essay = Question.objects.create(quiz=self.quiz, content='Explain.', type='essay')
+        for submission, verdict in zip(QuizSubmission.objects.filter(quiz=self.quiz), (True, None)):
+            Answer.objects.create(submission=submission, question=essay, text='Because.', is_correct=verdict, needs_review=verdict is None)
+
+        # user, ownership, questions, score histogram
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('quiz-analytics', args=[self.quiz.id]))
+        counted = response.data['questions'][-1]
+        self.assertEqual((counted['answer_count'], counted['correct_count'], counted['choices']), (2, 1, []))
+
+    def test_rebuild_matches_incremental_counts(self):
+        url = reverse('quiz-analytics', args=[self.quiz.id])
+        before = self.client.get(url).data
+        self.assertEqual(rebuild_choice_stats(self.quiz.id), 6)
+        self.assertEqual(self.client.get(url).data, before)
+
+    def test_deleted_answers_are_discounted(self):
+        QuizSubmission.objects.get(user__username='first').delete()
+        self.assertEqual(sorted(ChoiceStats.objects.values_list('answer_count', flat=True)), [0, 0, 0, 0, 1, 1])
+        CustomUser.objects.get(username='second').delete()
+        self.assertEqual(sorted(ChoiceStats.objects.values_list('answer_count', flat=True)), [0] * 6)
+
+        self.quiz.delete()
+        self.assertFalse(ChoiceStats.objects.exists())
+
+    def test_only_the_creator_can_read_statistics(self):
+        self.authenticate(self.create_user('intruder'))
+        self.assertEqual(self.client.get(reverse('quiz-analytics', args=[self.quiz.id])).status_code, 403)
+
+
+class QuizExportTests(QuizWhizTestCase):
+    def setUp(self):
+        self.creator = self.create_user('creator')
+        self.quiz = self.create_quiz(self.creator, questions=2)
+        self.submissions = [self.create_submission(self.quiz, self.create_user(f'student{i}')) for i in range(3)]
+        self.create_submission(self.quiz, self.create_user('idle'), answered=False)
+        # A submission of another quiz must not leak into the merge.
+        self.create_submission(self.create_quiz(self.creator), self.create_user('other'))
+        self.authenticate(self.creator)
+
+    def export(self, export_format, queries):
+        response = self.client.get(reverse('quiz-export', args=[self.quiz.id, export_format]))
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(queries):
+            return b''.join(response.streaming_content).decode()
+
+    def test_csv_pivots_answers_into_question_columns(self):
+        # questions, submissions, answers
+        rows = list(csv.reader(io.StringIO(self.export('csv', 3))))
+
+        self.assertEqual(rows[0][-2:], ['1. Question 0', '2. Question 1'])
+        self.assertEqual(len(rows), 5)
+        by_email = {row[1]: row for row in rows[1:]}
+        self.assertEqual(by_email['student0@example.com'][-2:], ['Choice 0', 'Choice 0'])
+        self.assertEqual(by_email['idle@example.com'][-2:], ['', ''])
+
+    def test_ndjson_has_one_line_per_submission(self):
+        lines = [json.loads(line) for line in self.export('ndjson', 2).splitlines()]
+
+        self.assertEqual({line['submission'] for line in lines}, {str(submission.id) for submission in QuizSubmission.objects.filter(quiz=self.quiz)})
+        answered = next(line for line in lines if line['email'] == 'student1@example.com')
+        self.assertEqual(len(answered['answers']), 2)
+        self.assertTrue(all(answer['is_correct'] for answer in answered['answers'].values()))
+
+    def test_unknown_format_and_other_users_are_refused(self):
+        self.assertEqual(self.client.get(reverse('quiz-export', args=[self.quiz.id, 'xml'])).status_code, 404)
+        self.authenticate(self.create_user('intruder'))
+        self.assertEqual(self.client.get(reverse('quiz-export', args=[self.quiz.id, 'csv'])).status_code, 403)
+
+
+class QuizCloneTests(QuizWhizTestCase):
+    def setUp(self):
+        self.creator = self.create_user('creator')
+        self.authenticate(self.creator)
+
+    def clone(self, quiz, **data):
+        response = self.client.post(reverse('clone-quiz', args=[quiz.id]), data, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Quiz.objects.get(pk=response.data['id'])
+
+    def test_clone_remaps_correct_choices(self):
+        quiz = self.create_quiz(self.creator, questions=2)
+        second = quiz.questions.order_by('id').last()
+        second.correct_choice = second.choices.order_by('id').last()
+        second.save()
+        Question.objects.create(quiz=quiz, content='Essay', type='essay')
+
+        clone = self.clone(quiz, title='Cohort 2')
+
+        self.assertEqual((clone.title, clone.creator, clone.duration), ('Cohort 2', self.creator, quiz.duration))
+        copied = list(clone.questions.order_by('id'))
+        self.assertEqual([question.content for question in copied], ['Question 0', 'Question 1', 'Essay'])
+        self.assertEqual([question.correct_choice and question.correct_choice.content for question in copied], ['Choice 0', 'Choice 2', None])
+        self.assertTrue(all(question.correct_choice.question_id == question.id for question in copied[:2]))
+        self.assertEqual(quiz.questions.count(), 3)
+
+    def test_query_count_does_not_grow_with_the_quiz(self):
+        small, large = self.create_quiz(self.creator, questions=2), self.create_quiz(self.creator, questions=40)
+        # Correct choices at every position, so no position gets its own query.
+        for position, question in enumerate(large.questions.order_by('id')):
+            question.correct_choice = question.choices.order_by('id')[position % 3]
+            question.save()
+        self.clone(small)
+        counts = []
+        for quiz in (small, large):
+            with CaptureQueriesContext(connection) as queries:
+                clone = self.clone(quiz)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(
+            list(clone.questions.order_by('id').values_list('correct_choice__content', flat=True)),
+            [f'Choice {position % 3}' for position in range(40)],
+        )
+
+    def test_correct_choices_are_linked_by_one_update_past_the_batch_size(self):
+        # 300 questions and 1,200 choices take several INSERT batches on SQLite.
+        quiz = self.create_quiz(self.creator, questions=0)
+        import_questions(quiz.id, [
+            {'content': f'Question {i}', 'choices': [f'Choice {j}' for j in range(4)], 'correct_choice': i % 4}
+            for i in range(300)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            clone = self.clone(quiz)
+
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "quiz_question"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            list(clone.questions.order_by('id').values_list('correct_choice__content', flat=True)),
+            [f'Choice {i % 4}' for i in range(300)],
+        )
+        self.assertFalse(Question.objects.filter(quiz=clone).exclude(correct_choice__question=F('id')).exists())
+        connection.check_constraints()
+
+    def test_only_the_creator_can_clone(self):
+        quiz = self.create_quiz(self.creator)
+        self.authenticate(self.create_user('intruder'))
+        self.assertEqual(self.client.post(reverse('clone-quiz', args=[quiz.id])).status_code, 403)
+
+
+class QuizImportTests(QuizWhizTestCase):
+    def setUp(self):
+        self.creator = self.create_user('creator')
+        self.quiz = self.create_quiz(self.creator, questions=0)
+        self.url = reverse('quiz-import', args=[self.quiz.id])
+        self.authenticate(self.creator)
+
+    def test_json_import_links_correct_choices(self):
+        bank = [
+            {'content': 'Capital of France?', 'choices': ['Rome', 'Paris'], 'correct_choice': 1},
+            {'content': 'Explain.', 'type': 'essay'},
+        ]
+        response = self.client.post(self.url, json.dumps(bank), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['questions'], response.data['choices']), (2, 2))
+        question = self.quiz.questions.get(content='Capital of France?')
+        self.assertEqual(question.correct_choice.content, 'Paris')
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.revision, 1)
+
+    def test_csv_import(self):
+        bank = 'content,type,correct_choice,choice,choice\n"2 + 2, in words?",mcq,0,four,five\n'
+        response = self.client.post(self.url, bank, content_type='text/csv')
+
+        self.assertEqual(response.status_code, 201)
+        question = self.quiz.questions.get()
+        self.assertEqual(question.content, '2 + 2, in words?')
+        self.assertEqual(question.correct_choice.content, 'four')
+
+    def test_invalid_items_import_nothing(self):
+        bank = [{'content': 'Valid', 'choices': ['a']}, {'content': 'Invalid', 'choices': ['a'], 'correct_choice': 3}]
+        response = self.client.post(self.url, json.dumps(bank), content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['item'], 2)
+        self.assertFalse(self.quiz.questions.exists())
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import ChoiceDetailsView, ChoiceView, CreatedQuizzesView, JoinQuizView, QuestionDetailsView, QuestionView, QuizCreateView, QuizDetailView, QuizQuestions, RegisterView, CustomTokenObtainPairView, QuizSubmissionView, StartSubmissionSessionView, TakenQuizzesView, UserProfileView, QuizSubmissionGetView
+from .views import ChoiceDetailsView, ChoiceView, CreatedQuizzesView, JoinQuizView, QuestionDetailsView, QuestionView, QuizCreateView, QuizDetailView, QuizAnalyticsView, QuizCloneView, QuizExportView, QuizImportView, QuizGradeView, QuizCloseView, QuizQuestions, QuizRosterView, RegisterView, CustomTokenObtainPairView, QuizSubmissionBatchView, QuizSubmissionView, ResumeSubmissionView, ReviewClaimView, ReviewGradeView, StartSubmissionSessionView, SubmissionProgressView, TakenQuizzesView, UserProfileView, QuizSubmissionGetView, submission_events
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
@@ -16,11 +16,25 @@ urlpatterns = [
     path('question/<int:question_id>/choice/', ChoiceView.as_view(), name='choice-list-create'),
     path('question/<int:question_id>/choice/<int:pk>/', ChoiceDetailsView.as_view(), name='choice-detail'),
 
+    path('quiz/<uuid:quiz_id>/roster/', QuizRosterView.as_view(), name='quiz-roster'),
     path('quiz/<uuid:quiz_id>/join/', JoinQuizView.as_view(), name='join-quiz'),
     path('quiz/<uuid:quiz_id>/submit/<uuid:submission_id>/start/', StartSubmissionSessionView.as_view(), name='start-submission-session'),
     path('quiz/<uuid:quiz_id>/submit/<uuid:submission_id>/questions/', QuizQuestions.as_view(), name='show-quiz-question'),
     path('quiz/<uuid:quiz_id>/submit/<uuid:submission_id>/', QuizSubmissionView.as_view(), name='submit-answer'),
+    path('quiz/<uuid:quiz_id>/submit/<uuid:submission_id>/batch/', QuizSubmissionBatchView.as_view(), name='submit-answer-batch'),
+    path('quiz/<uuid:quiz_id>/submit/<uuid:submission_id>/progress/', SubmissionProgressView.as_view(), name='submission-progress'),
+    path('quiz/<uuid:quiz_id>/submit/<uuid:submission_id>/resume/', ResumeSubmissionView.as_view(), name='resume-submission'),
     
+    path('quiz/<uuid:quiz_id>/submit/<uuid:submission_id>/events/', submission_events, name='submission-events'),
+    path('quiz/<uuid:quiz_id>/clone/', QuizCloneView.as_view(), name='clone-quiz'),
+    path('quiz/<uuid:quiz_id>/close/', QuizCloseView.as_view(), name='close-quiz'),
+    path('quiz/<uuid:quiz_id>/grade/', QuizGradeView.as_view(), name='grade-quiz'),
+    path('quiz/<uuid:quiz_id>/reviews/claim/', ReviewClaimView.as_view(), name='review-claim'),
+    path('quiz/<uuid:quiz_id>/reviews/grade/', ReviewGradeView.as_view(), name='review-grade'),
+    path('quiz/<uuid:quiz_id>/analytics/', QuizAnalyticsView.as_view(), name='quiz-analytics'),
+    path('quiz/<uuid:quiz_id>/import/', QuizImportView.as_view(), name='quiz-import'),
+    path('quiz/<uuid:quiz_id>/export/<str:export_format>/', QuizExportView.as_view(), name='quiz-export'),
+
     path('quiz/created/', CreatedQuizzesView.as_view(), name='created-quizzes'),
     path('quiz/taken/', TakenQuizzesView.as_view(), name='taken-quizzes'),
 ]
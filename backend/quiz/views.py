@@ -1,12 +1,34 @@
-from datetime import datetime
-from django.http import JsonResponse
-from rest_framework import generics, permissions, status
+from django.db import IntegrityError, transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F, Prefetch, Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .models import Answer, Choice, CustomUser, Question, Quiz, QuizSubmission
-from .serializers import AnswerSerializer, ChoiceSerializer, QuestionSerializer, QuizListSerializer, QuizQuestionSerializer, RegisterSerializer, CustomTokenObtainPairSerializer, QuizSubmissionSerializer, UserSerializer, QuizSerializer
+from .serializers import answer_errors, AnswerBatchSerializer, AnswerItemSerializer, ChoiceSerializer, CreatedQuizSummarySerializer, QuestionSerializer, QuizCloneSerializer, QuizListSerializer, RegisterSerializer, CustomTokenObtainPairSerializer, QuizSubmissionSerializer, ResumeSubmissionSerializer, ReviewAnswerSerializer, ReviewClaimSerializer, ReviewGradeSerializer, RosterSerializer, SubmissionProgressSerializer, UserSerializer, QuizSerializer
+from . import live
+from .analytics import count_choice_answers, get_quiz_analytics
+from .authentication import ClaimsForReadsMixin, TokenClaimsAuthentication
+from .pagination import NewestFirstPagination, RecentlyJoinedPagination
 from .permissions import IsCreator
+from .renderers import DATA_RENDERERS, render_map
+from .reviews import claim_answers, grade_answers
+from .cloning import clone_quiz
+from .cache import get_answer_key, get_questions_snapshot, get_quiz_duration
+from .etags import is_not_modified, not_modified, quiz_etag, with_etag
+from .export import EXPORT_FORMATS
+from .idempotency import idempotent
+from .importer import IMPORT_FORMATS, QuizImportError, import_questions, read_chunks
+from .journal import get_journal
+from .grading import build_answer, grade_quiz, record_answers, regrade_question, upsert_answer
+
+LIVE_EVENTS_HEARTBEAT = 15
 
 
 class RegisterView(generics.CreateAPIView):
@@ -31,17 +53,30 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
     def update(self, request, *args, **kwargs):
-        user = self.get_object()
+        # A fresh instance: `request.user` may be shared through the user cache.
+        user = CustomUser.objects.get(pk=request.user.pk)
         serializer = self.get_serializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
         return Response(serializer.data)
 
 
-class QuizCreateView(generics.ListCreateAPIView):
-    queryset = Quiz.objects.all()
+class QuizCreateView(ClaimsForReadsMixin, generics.ListCreateAPIView):
     serializer_class = QuizSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NewestFirstPagination
+
+    def is_summary(self):
+        # `?summary=1` lists the quizzes without their questions.
+        return self.request.method == 'GET' and self.request.query_params.get('summary') in ('1', 'true')
+
+    def get_queryset(self):
+        if self.is_summary():
+            return Quiz.objects.all()
+        return Quiz.objects.prefetch_related('questions__choices')
+
+    def get_serializer_class(self):
+        return QuizListSerializer if self.is_summary() else QuizSerializer
 
 class QuizDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Quiz.objects.all()
@@ -49,7 +84,20 @@ class QuizDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated, IsCreator]
 
     def get_queryset(self):
-        return Quiz.objects.filter(creator=self.request.user)
+        return Quiz.objects.filter(creator_id=self.request.user.id).prefetch_related('questions__choices')
+
+    def retrieve(self, request, *args, **kwargs):
+        # A revalidation is answered from the revision alone, without loading the questions.
+        if 'If-None-Match' in request.headers:
+            revision = Quiz.objects.filter(pk=kwargs['pk'], creator_id=request.user.id).values_list('revision', flat=True).first()
+            if revision is not None:
+                etag = quiz_etag(kwargs['pk'], revision, 'detail', request.accepted_media_type)
+                if is_not_modified(request, etag):
+                    return not_modified(etag)
+
+        quiz = self.get_object()
+        response = Response(self.get_serializer(quiz).data)
+        return with_etag(response, quiz_etag(quiz.pk, quiz.revision, 'detail', request.accepted_media_type))
 
 class QuestionView(generics.ListCreateAPIView):
     queryset = Question.objects.all()
@@ -58,12 +106,10 @@ class QuestionView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         quiz_id = self.kwargs['quiz_id']
-        return Question.objects.filter(quiz__id=quiz_id, quiz__creator=self.request.user)
+        return Question.objects.filter(quiz_id=quiz_id).prefetch_related('choices')
 
     def perform_create(self, serializer):
-        quiz_id = self.kwargs['quiz_id']
-        quiz = Quiz.objects.get(id=quiz_id, creator=self.request.user)
-        serializer.save(quiz=quiz)
+        serializer.save(quiz_id=self.kwargs['quiz_id'])
 
 class QuestionDetailsView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Question.objects.all()
@@ -72,7 +118,13 @@ class QuestionDetailsView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         quiz_id = self.kwargs['quiz_id']
-        return Question.objects.filter(quiz__id=quiz_id, quiz__creator=self.request.user)
+        return Question.objects.filter(quiz_id=quiz_id).prefetch_related('choices')
+
+    def perform_update(self, serializer):
+        previous = (serializer.instance.type, serializer.instance.correct_choice_id)
+        question = serializer.save()
+        if (question.type, question.correct_choice_id) != previous:
+            regrade_question(question)
 
 class ChoiceView(generics.ListCreateAPIView):
     serializer_class = ChoiceSerializer
@@ -80,12 +132,10 @@ class ChoiceView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         question_id = self.kwargs['question_id']
-        return Choice.objects.filter(question__id=question_id)
+        return Choice.objects.filter(question_id=question_id)
 
     def perform_create(self, serializer):
-        question_id = self.kwargs['question_id']
-        question = Question.objects.get(id=question_id)
-        serializer.save(question=question)
+        serializer.save(question_id=self.kwargs['question_id'])
 
 
 class ChoiceDetailsView(generics.RetrieveUpdateDestroyAPIView):
@@ -95,22 +145,26 @@ class ChoiceDetailsView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         question_id = self.kwargs['question_id']
-        return Choice.objects.filter(question__id=question_id, question__quiz__creator=self.request.user)
+        return Choice.objects.filter(question_id=question_id)
 
 
-class JoinQuizView(APIView):
+class JoinQuizView(ClaimsForReadsMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    use_read_replica = True
 
     def get(self, request, quiz_id):
         try:
             quiz = Quiz.objects.get(id=quiz_id)
-            return Response({
+            etag = quiz_etag(quiz.pk, quiz.revision, 'invitation', request.accepted_media_type)
+            if is_not_modified(request, etag):
+                return not_modified(etag)
+            return with_etag(Response({
                 'title': quiz.title,
                 'description': quiz.description,
                 'has_password': quiz.password != "",
                 'start_time': quiz.start_time,
                 'duration': quiz.duration
-            }, status=status.HTTP_200_OK)
+            }, status=status.HTTP_200_OK), etag)
         except Quiz.DoesNotExist:
             return Response({'error': 'Invalid invitation link'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -120,125 +174,463 @@ class JoinQuizView(APIView):
 
             if quiz.password:
                 password = request.data.get('password')
-                print(password)
                 if not password:
                     return Response({'error': 'Quiz password is required'}, status=status.HTTP_403_FORBIDDEN)
                 if quiz.password != password:
                     return Response({'error': 'Invalid password'}, status=status.HTTP_403_FORBIDDEN)
 
-            quiz_submission, created = QuizSubmission.objects.get_or_create(user=request.user, quiz=quiz)
-            if created:
-                return Response({'message': 'Successfully joined the quiz'}, status=status.HTTP_200_OK)
-            else:
-                return Response({'message': 'Already joined this quiz'}, status=status.HTTP_200_OK)
+            try:
+                with transaction.atomic():
+                    submission = QuizSubmission.objects.create(user_id=request.user.id, quiz=quiz)
+            except IntegrityError:
+                submission_id = QuizSubmission.objects.values_list('id', flat=True).get(user_id=request.user.id, quiz=quiz)
+                return Response({'message': 'Already joined this quiz', 'submission_id': submission_id}, status=status.HTTP_200_OK)
+            return Response({'message': 'Successfully joined the quiz', 'submission_id': submission.id}, status=status.HTTP_200_OK)
         except Quiz.DoesNotExist:
             return Response({'error': 'Invalid invitation link'}, status=status.HTTP_404_NOT_FOUND)
         
 
-class StartSubmissionSessionView(APIView):
+class StartSubmissionSessionView(ClaimsForReadsMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, quiz_id, submission_id):
-        try:
-            submission = QuizSubmission.objects.get(id=submission_id, quiz=quiz_id, user=request.user)
-            if submission.started_at:
-                return Response({'error': 'You already started this quiz'}, status=status.HTTP_400_BAD_REQUEST)
+        duration = get_quiz_duration(quiz_id)
+        started_at = timezone.now()
+        end_at = started_at + duration if duration else None
 
-            submission.started_at = datetime.now()
-            submission.end_at = submission.started_at + submission.quiz.duration
-            submission.save()
-
-            return Response({'message': 'Quiz session started successfully', 'end_at': submission.end_at}, status=status.HTTP_200_OK)
-        except QuizSubmission.DoesNotExist:
-            return Response({'error': 'You have not joined this quiz or invalid link.'}, status=status.HTTP_404_NOT_FOUND)
+        # A single conditional UPDATE; only the not-found and already-started
+        # paths read the row.
+        submission = QuizSubmission.objects.filter(id=submission_id, quiz=quiz_id, user_id=request.user.id)
+        if submission.filter(started_at__isnull=True).update(started_at=started_at, end_at=end_at, state='in_progress'):
+            return Response({'message': 'Quiz session started successfully', 'end_at': end_at}, status=status.HTTP_200_OK)
+        if submission.exists():
+            return Response({'error': 'You already started this quiz'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'error': 'You have not joined this quiz or invalid link.'}, status=status.HTTP_404_NOT_FOUND)
 
 
 class QuizQuestions(APIView):
+    authentication_classes = [TokenClaimsAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    # The snapshot is cached already rendered, once per media type.
+    renderer_classes = DATA_RENDERERS
 
     def get(self, request, quiz_id, submission_id):
         try:
-            submission = QuizSubmission.objects.get(id=submission_id, quiz=quiz_id, user=request.user)
+            revision = QuizSubmission.objects.values_list('quiz__revision', flat=True).get(id=submission_id, quiz=quiz_id, user_id=request.user.id)
         except QuizSubmission.DoesNotExist:
             return Response({'error': 'You have not joined this quiz or invalid link.'}, status=status.HTTP_404_NOT_FOUND)
 
-        questions = Question.objects.filter(quiz=quiz_id)
-        serializer = QuizQuestionSerializer(questions, many=True)
-        return Response({'questions': serializer.data}, status=status.HTTP_200_OK)
+        renderer = request.accepted_renderer
+        etag = quiz_etag(quiz_id, revision, 'questions', renderer.media_type)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        snapshot = get_questions_snapshot(quiz_id, revision, renderer)
+        return with_etag(HttpResponse(snapshot, content_type=renderer.media_type, status=status.HTTP_200_OK), etag)
+
+
+
+async def submission_events(request, quiz_id, submission_id):
+    """
+    Server-sent events for a running submission: its deadline, state changes
+    and the forced submission at expiry. EventSource cannot send headers, so
+    the access token may also be passed as `?token=`.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Live events require the ASGI server.'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else request.GET.get('token')
+    try:
+        user_id = authentication.get_validated_token(raw_token)[jwt_settings.USER_ID_CLAIM]
+    except (InvalidToken, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid or missing token.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if not await QuizSubmission.objects.filter(id=submission_id, quiz=quiz_id, user=user_id).aexists():
+        return JsonResponse({'error': 'You have not joined this quiz or invalid link.'}, status=status.HTTP_404_NOT_FOUND)
+
+    response = StreamingHttpResponse(
+        live.hub.stream(quiz_id, submission_id, heartbeat=LIVE_EVENTS_HEARTBEAT),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def get_open_submission_revision(request, quiz_id, submission_id):
+    """
+    The quiz revision of the user's submission, or an error response when
+    the submission does not exist or no longer takes answers.
+    """
+    try:
+        revision, state, end_at = QuizSubmission.objects.values_list('quiz__revision', 'state', 'end_at').get(
+            id=submission_id, quiz=quiz_id, user_id=request.user.id,
+        )
+    except QuizSubmission.DoesNotExist:
+        return Response({'error': 'You have not joined this quiz or invalid link.'}, status=status.HTTP_404_NOT_FOUND)
+    if state in live.FINISHED_STATES or (end_at is not None and end_at <= timezone.now()):
+        return Response({'error': 'This quiz session has ended'}, status=status.HTTP_403_FORBIDDEN)
+    return revision
+
+
+class QuizSubmissionView(ClaimsForReadsMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_answer(self, request, quiz_id, submission_id):
+        """The validated answer and the answer key entry of its question, or an error response."""
+        revision = get_open_submission_revision(request, quiz_id, submission_id)
+        if isinstance(revision, Response):
+            return revision
 
+        serializer = AnswerItemSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        entry = get_answer_key(quiz_id, revision).get(serializer.validated_data['question'])
+        if entry is None:
+            return Response({'error': 'Question not found'}, status=status.HTTP_404_NOT_FOUND)
+        errors = answer_errors(serializer.validated_data, entry)
+        if errors and 'choice' in errors:
+            return Response({'error': 'Choice not found'}, status=status.HTTP_404_NOT_FOUND)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return serializer.validated_data, entry
+
+    @idempotent
+    def post(self, request, quiz_id, submission_id):
+        result = self.get_answer(request, quiz_id, submission_id)
+        if isinstance(result, Response):
+            return result
+        data, entry = result
+        question_id = data['question']
+        choice_id = data.get('choice')
+
+        # The journal only carries choices; essays are written directly.
+        journal = get_journal()
+        if journal is not None and entry['type'] == 'mcq':
+            if journal.append(submission_id, [(question_id, choice_id)]):
+                return Response({'error': 'Question is already answered'}, status=status.HTTP_409_CONFLICT)
+            return Response({'message': 'Submitted successfully'}, status=status.HTTP_200_OK)
 
-class QuizSubmissionView(APIView):
+        answer = build_answer(submission_id, question_id, entry, choice_id, data.get('text', ''))
+        try:
+            with transaction.atomic():
+                answer.save(force_insert=True)
+                record_answers(submission_id, answered=1, correct=int(answer.is_correct is True))
+                if answer.choice_id is not None:
+                    count_choice_answers([answer.choice_id])
+        except IntegrityError:
+            return Response({'error': 'Question is already answered'}, status=status.HTTP_409_CONFLICT)
+
+        return Response({'message': 'Submitted successfully'}, status=status.HTTP_200_OK)
+
+    @idempotent
+    def put(self, request, quiz_id, submission_id):
+        """Answer a question, or change its answer."""
+        result = self.get_answer(request, quiz_id, submission_id)
+        if isinstance(result, Response):
+            return result
+        data, entry = result
+
+        # Written directly, even with the journal: an older journaled answer
+        # to the question is dropped when it is flushed.
+        answer = build_answer(submission_id, data['question'], entry, data.get('choice'), data.get('text', ''))
+        with transaction.atomic():
+            changed = upsert_answer(answer)
+        return Response({'message': 'Submitted successfully', 'changed': changed}, status=status.HTTP_200_OK)
+
+
+class QuizSubmissionBatchView(ClaimsForReadsMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request, quiz_id, submission_id):
+        revision = get_open_submission_revision(request, quiz_id, submission_id)
+        if isinstance(revision, Response):
+            return revision
+
+        answer_key = get_answer_key(quiz_id, revision)
+        serializer = AnswerBatchSerializer(data=request.data, context={'answer_key': answer_key})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        answers = serializer.validated_data['answers']
+
+        # The journal only carries choices; essays are written directly.
+        journal = get_journal()
+        direct, journaled = answers, []
+        if journal is not None:
+            direct = [answer for answer in answers if answer_key[answer['question']]['type'] != 'mcq']
+            journaled = [answer for answer in answers if answer_key[answer['question']]['type'] == 'mcq']
+        already_answered = set()
+        if direct:
+            # An answer written concurrently by another request between the
+            # read and the insert fails the whole insert. It is committed by
+            # then, so the retry skips it like any other answered question.
+            for attempt in range(2):
+                try:
+                    with transaction.atomic():
+                        already_answered = self.save_answers(submission_id, direct, answer_key)
+                    break
+                except IntegrityError:
+                    if attempt:
+                        return Response({'error': 'Question is already answered'}, status=status.HTTP_409_CONFLICT)
+        if journaled:
+            already_answered |= journal.append(submission_id, [(answer['question'], answer['choice']) for answer in journaled])
+
+        return Response({
+            'message': 'Submitted successfully',
+            'submitted': [answer['question'] for answer in answers if answer['question'] not in already_answered],
+            'already_answered': sorted(already_answered),
+        }, status=status.HTTP_200_OK)
+
+    def save_answers(self, submission_id, answers, answer_key):
+        already_answered = set(Answer.objects.filter(
+            submission=submission_id,
+            question__in=[answer['question'] for answer in answers],
+        ).values_list('question', flat=True))
+        new_answers = [
+            build_answer(submission_id, answer['question'], answer_key[answer['question']], answer.get('choice'), answer.get('text', ''))
+            for answer in answers if answer['question'] not in already_answered
+        ]
+        Answer.objects.bulk_create(new_answers)
+        if new_answers:
+            record_answers(submission_id, answered=len(new_answers), correct=sum(answer.is_correct is True for answer in new_answers))
+            count_choice_answers(answer.choice_id for answer in new_answers if answer.choice_id is not None)
+        return already_answered
+
+
+class SubmissionProgressView(APIView):
+    authentication_classes = [TokenClaimsAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, quiz_id, submission_id):
         try:
-            submission = QuizSubmission.objects.get(id=submission_id, quiz=quiz_id, user=request.user)
+            submission = QuizSubmission.objects.annotate(quiz_revision=F('quiz__revision')).only(
+                'id', 'state', 'answered_count', 'correct_count', 'score', 'end_at',
+            ).get(id=submission_id, quiz=quiz_id, user_id=request.user.id)
         except QuizSubmission.DoesNotExist:
             return Response({'error': 'You have not joined this quiz or invalid link.'}, status=status.HTTP_404_NOT_FOUND)
 
+        submission.question_count = len(get_answer_key(quiz_id, submission.quiz_revision))
+        journal = get_journal()
+        if journal is not None:
+            submission.answered_count += len(journal.pending_answers(submission_id))
+        return Response(SubmissionProgressSerializer(submission).data, status=status.HTTP_200_OK)
+
+
+class ResumeSubmissionView(APIView):
+    """
+    Everything a participant needs to rebuild the exam screen: the submission,
+    the questions and their own answers, in at most three queries.
+    """
+    authentication_classes = [TokenClaimsAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    # The questions are embedded from the cached snapshot of the media type.
+    renderer_classes = DATA_RENDERERS
+
+    def get(self, request, quiz_id, submission_id):
         try:
-            question = Question.objects.get(id=request.data.get('question'), quiz=quiz_id)
-        except Question.DoesNotExist:
-            return Response({'error': 'Question not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        try:
-            choice = Choice.objects.get(id=request.data.get('choice'), question=question)
-        except Choice.DoesNotExist:
-            return Response({'error': 'Choice not found'}, status=status.HTTP_404_NOT_FOUND)
+            submission = QuizSubmission.objects.annotate(quiz_revision=F('quiz__revision')).only(
+                'id', 'state', 'started_at', 'end_at', 'answered_count',
+            ).get(id=submission_id, quiz=quiz_id, user_id=request.user.id)
+        except QuizSubmission.DoesNotExist:
+            return Response({'error': 'You have not joined this quiz or invalid link.'}, status=status.HTTP_404_NOT_FOUND)
 
-        answer_data = {
-            'submission': submission.id,
-            'question': question.id,
-            'choice': choice.id,
+        answers = {
+            question_id: {'question': question_id, 'choice': choice_id, 'text': text}
+            for question_id, choice_id, text in Answer.objects.filter(submission=submission_id).order_by('question').values_list('question', 'choice', 'text')
         }
+        journal = get_journal()
+        if journal is not None:
+            pending = journal.pending_answers(submission_id)
+            submission.answered_count += len(pending)
+            for question_id, choice_id in pending.items():
+                answers.setdefault(question_id, {'question': question_id, 'choice': choice_id, 'text': ''})
+
+        renderer = request.accepted_renderer
+        content = render_map(renderer, [
+            ('submission', renderer.render(ResumeSubmissionSerializer(submission).data)),
+            ('answers', renderer.render(sorted(answers.values(), key=lambda answer: answer['question']))),
+            ('quiz', get_questions_snapshot(quiz_id, submission.quiz_revision, renderer)),
+        ])
+        return HttpResponse(content, content_type=renderer.media_type, status=status.HTTP_200_OK)
+
+
+class QuizRosterView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsCreator]
 
-        try:
-            answer = Answer.objects.get(submission=submission.id, question=question.id)
-            if answer:
-                return Response({'error': 'Question is already answered'}, status=status.HTTP_409_CONFLICT)
-        except Answer.DoesNotExist:
-            serializer = AnswerSerializer(data=answer_data, context={'request': request})
-            if serializer.is_valid():
-                answer_instance = serializer.save()
-                # Check if the answer is correct for MCQs
-                if question.type == 'mcq' and answer_instance.choice.id == question.correct_choice.id:
-                    answer_instance.is_correct = True
-                else:
-                    answer_instance.is_correct = False
-                answer_instance.save()
-
-                return Response({'message': 'Submitted successfully'}, status=status.HTTP_200_OK)
+    def post(self, request, quiz_id):
+        serializer = RosterSerializer(data=request.data)
+        if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        emails = set(serializer.validated_data['emails'])
 
+        users = dict(CustomUser.objects.filter(email__in=emails).values_list('email', 'id'))
+        QuizSubmission.objects.bulk_create(
+            [QuizSubmission(quiz_id=quiz_id, user_id=user_id) for user_id in users.values()],
+            ignore_conflicts=True,
+        )
+        return Response({
+            'message': 'Roster registered successfully',
+            'registered': sorted(users),
+            'unknown': sorted(emails - users.keys()),
+        }, status=status.HTTP_200_OK)
+
+
+class QuizCloneView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsCreator]
+
+    def post(self, request, quiz_id):
+        serializer = QuizCloneSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        quiz = Quiz.objects.get(pk=quiz_id)
+        clone, questions, choices = clone_quiz(quiz, request.user.id, **serializer.validated_data)
+        return Response({
+            'message': 'Quiz cloned successfully',
+            'id': clone.id,
+            'questions': questions,
+            'choices': choices,
+        }, status=status.HTTP_201_CREATED)
+
+
+class QuizCloseView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsCreator]
+
+    def post(self, request, quiz_id):
+        now = timezone.now()
+        closed = QuizSubmission.objects.filter(quiz=quiz_id, state='in_progress').filter(
+            Q(end_at__isnull=True) | Q(end_at__gt=now)
+        ).update(end_at=now)
+        return Response({'message': 'Quiz closed successfully', 'closed': closed}, status=status.HTTP_200_OK)
+
+
+class QuizGradeView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsCreator]
+
+    def post(self, request, quiz_id):
+        regrade = serializers.BooleanField().to_internal_value(request.data.get('regrade', False))
+        graded = grade_quiz(quiz_id, regrade=regrade)
+        return Response({'message': 'Quiz graded successfully', 'graded': graded}, status=status.HTTP_200_OK)
+
+
+class ReviewClaimView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsCreator]
+
+    def post(self, request, quiz_id):
+        serializer = ReviewClaimSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        lease, expires, claimed = claim_answers(quiz_id, serializer.validated_data['limit'], serializer.validated_data.get('question'))
+        answers = Answer.objects.filter(pk__in=claimed).order_by('question', 'id')
+        return Response({
+            'lease': lease,
+            'expires_at': expires,
+            'answers': ReviewAnswerSerializer(answers, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+
+class ReviewGradeView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsCreator]
+
+    def post(self, request, quiz_id):
+        serializer = ReviewGradeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        grades = {item['answer']: item['is_correct'] for item in serializer.validated_data['grades']}
+        graded = grade_answers(quiz_id, serializer.validated_data['lease'], grades)
+        return Response({
+            'message': 'Answers graded successfully',
+            'graded': graded,
+            # Unknown, already graded, or leased by someone else since the lease expired.
+            'rejected': sorted(grades.keys() - set(graded)),
+        }, status=status.HTTP_200_OK)
+
+
+class QuizImportView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsCreator]
+
+    def post(self, request, quiz_id):
+        # The body is streamed, never loaded through `request.data`.
+        parse = IMPORT_FORMATS.get(request.content_type.split(';')[0].strip())
+        if parse is None:
+            return Response(
+                {'error': f'Send the questions as one of: {", ".join(IMPORT_FORMATS)}.'},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        if request.stream is None:
+            return Response({'error': 'No questions were sent.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            questions, choices = import_questions(quiz_id, parse(read_chunks(request.stream)))
+        except QuizImportError as error:
+            return Response({'error': str(error), 'errors': error.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': 'Questions imported', 'questions': questions, 'choices': choices}, status=status.HTTP_201_CREATED)
+
+
+class QuizAnalyticsView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsCreator]
+
+    def get(self, request, quiz_id):
+        return Response(get_quiz_analytics(quiz_id), status=status.HTTP_200_OK)
+
+
+class QuizExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsCreator]
+
+    def perform_content_negotiation(self, request, force=False):
+        # The export is not rendered, so clients may accept only its media type.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, quiz_id, export_format):
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'Export the quiz as one of: {", ".join(EXPORT_FORMATS)}.'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        export, content_type = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(export(quiz_id), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="quiz-{quiz_id}.{export_format}"'
+        return response
 
 
 class CreatedQuizzesView(generics.ListAPIView):
     serializer_class = QuizListSerializer
+    authentication_classes = [TokenClaimsAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NewestFirstPagination
+    use_read_replica = True
 
     def get_queryset(self):
-        return Quiz.objects.filter(creator=self.request.user)
+        return Quiz.objects.filter(creator_id=self.request.user.id)
 
 
 class TakenQuizzesView(generics.ListAPIView):
     serializer_class = QuizListSerializer
+    authentication_classes = [TokenClaimsAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NewestFirstPagination
+    use_read_replica = True
 
     def get_queryset(self):
-        taken_quizzes = QuizSubmission.objects.filter(user=self.request.user).values_list('quiz', flat=True)
+        taken_quizzes = QuizSubmission.objects.filter(user_id=self.request.user.id).values_list('quiz', flat=True)
         return Quiz.objects.filter(id__in=taken_quizzes)
 
 
 
 class QuizSubmissionGetView(generics.ListAPIView):
+    authentication_classes = [TokenClaimsAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    use_read_replica = True
     serializer_class = QuizSubmissionSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        created_quizzes = Quiz.objects.filter(creator=user)
-        participated_quizzes = QuizSubmission.objects.filter(user=user)
+        user_id = self.request.user.id
+        created_quizzes = Quiz.objects.filter(creator_id=user_id).with_counts()
+        participated_quizzes = QuizSubmission.objects.filter(user_id=user_id).prefetch_related(
+            Prefetch('quiz', queryset=Quiz.objects.with_counts())
+        )
         return {
             'created': created_quizzes,
             'participated': participated_quizzes
@@ -246,10 +638,23 @@ class QuizSubmissionGetView(generics.ListAPIView):
 
     def list(self, request, *args, **kwargs):
         response = {}
-        created_quizzes = self.get_queryset()['created']
-        participated_quizzes = self.get_queryset()['participated']
+        queryset = self.get_queryset()
 
-        response['created'] = QuizSerializer(created_quizzes, many=True).data
-        response['participated'] = QuizSubmissionSerializer(participated_quizzes, many=True).data
+        # Each list pages through its own cursor parameter.
+        response['created'] = self.paginate(
+            NewestFirstPagination(), 'created_cursor', queryset['created'], CreatedQuizSummarySerializer,
+        )
+        response['participated'] = self.paginate(
+            RecentlyJoinedPagination(), 'participated_cursor', queryset['participated'], QuizSubmissionSerializer,
+        )
 
-        return Response(response)
\ No newline at end of file
+        return Response(response)
+
+    def paginate(self, paginator, cursor_query_param, queryset, serializer_class):
+        paginator.cursor_query_param = cursor_query_param
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        return {
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'results': serializer_class(page, many=True).data,
+        }
\ No newline at end of file
@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quizwhiz.settings')
 
 application = get_asgi_application()
+
+from quiz.journal import get_journal  # noqa: E402
+from quiz.sweeper import start_periodic_sweeper  # noqa: E402
+
+# Replay the answer journal left by a crash before serving requests.
+get_journal()
+start_periodic_sweeper()
@@ -0,0 +1,84 @@
+import threading
+from bisect import bisect_left
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield bound, cumulative
+
+
+class MetricsRegistry:
+    """
+    Per-route request histograms kept in process memory and rendered in the
+    Prometheus text exposition format.
+    """
+    metrics = {
+        'quizwhiz_request_duration_seconds': ('Time spent handling the request.', DURATION_BUCKETS),
+        'quizwhiz_request_db_seconds': ('Time spent in database queries.', DURATION_BUCKETS),
+        'quizwhiz_request_serializer_seconds': ('Time spent in DRF serializers building the response data.', DURATION_BUCKETS),
+        'quizwhiz_request_renderer_seconds': ('Time spent in the DRF renderer encoding the response data.', DURATION_BUCKETS),
+        'quizwhiz_request_queries': ('Number of database queries.', QUERY_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, labels, **values):
+        with self._lock:
+            for name, value in values.items():
+                key = (name, labels)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(self.metrics[name][1])
+                self._histograms[key].observe(value)
+
+    def render(self):
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            lines = []
+            for name, (description, _) in self.metrics.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for (metric, labels), histogram in histograms:
+                    if metric != name:
+                        continue
+                    label_text = ','.join(f'{key}="{escape(value)}"' for key, value in labels)
+                    for bound, count in histogram.samples():
+                        lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {count}')
+                    lines.append(f'{name}_sum{{{label_text}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    """Serve the histograms to staff users and to the addresses in `METRICS_ALLOWED_IPS`."""
+    allowed = request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    if not allowed and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
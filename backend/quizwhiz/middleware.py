@@ -0,0 +1,189 @@
+import logging
+import time
+from contextvars import ContextVar
+from functools import cache
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.serializers import BaseSerializer
+from .metrics import registry
+
+logger = logging.getLogger('quizwhiz.performance')
+
+# Timings of the current request, or None outside of requests. Context
+# variables follow the request into the thread running its sync code, so the
+# query and serializer timers below see it on WSGI and ASGI alike.
+performance = ContextVar('performance', default=None)
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and their total duration."""
+
+    def __init__(self, request, slow_query_threshold):
+        self.request = request
+        self.slow_query_threshold = slow_query_threshold
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            if self.slow_query_threshold is not None and duration * 1000 >= self.slow_query_threshold:
+                self.log_slow_query(sql, duration)
+
+    def log_slow_query(self, sql, duration):
+        match = self.request.resolver_match
+        if match is None or match.url_name not in slow_query_url_names():
+            return
+        logger.warning('Slow query on %s (%.1f ms): %s', match.route, duration * 1000, sql)
+
+
+@cache
+def slow_query_url_names():
+    from quiz.urls import urlpatterns
+
+    return {pattern.name for pattern in urlpatterns}
+
+
+def time_query(execute, sql, params, many, context):
+    timings = performance.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings['queries'](execute, sql, params, many, context)
+
+
+def install_query_timer(connection, **kwargs):
+    # First in the list, so `connection.execute_wrapper()` blocks entered
+    # before the connection opened still pop their own wrapper.
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+def install_query_timers(**kwargs):
+    for connection in connections.all(initialized_only=True):
+        install_query_timer(connection)
+
+
+def timed_serializer_data(data):
+    def wrapper(self):
+        timings = performance.get()
+        if timings is None or timings['serializing']:
+            return data(self)
+        timings['serializing'] = True
+        started = time.perf_counter()
+        try:
+            return data(self)
+        finally:
+            timings['serialize'] += time.perf_counter() - started
+            timings['serializing'] = False
+    return property(wrapper)
+
+
+@cache
+def install_timers():
+    # Connections belong to the thread running the sync code of the request,
+    # which the middleware does not run in under ASGI. The query timer is added
+    # to new connections, and to open ones from `request_started`, which both
+    # handlers send from that thread.
+    connection_created.connect(install_query_timer, dispatch_uid='quizwhiz.install_query_timer')
+    request_started.connect(install_query_timers, dispatch_uid='quizwhiz.install_query_timers')
+    # `Serializer.data` and `ListSerializer.data` both end in `BaseSerializer.data`,
+    # which runs `to_representation` on the whole tree.
+    BaseSerializer.data = timed_serializer_data(BaseSerializer.data.fget)
+
+
+class PerformanceMiddleware:
+    """
+    Record query count, database time, DRF serializer and renderer time and
+    view time for every request. The numbers are sent back in a `Server-Timing`
+    header and added to the per-route histograms served by
+    `quizwhiz.metrics.metrics_view`.
+
+    The serializer time covers `serializer.data` calls in the view, and is part
+    of the view time. The renderer time only covers encoding the response data.
+
+    Queries slower than `SLOW_QUERY_THRESHOLD_MS` on the `quiz` app routes are
+    logged to the `quizwhiz.performance` logger.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_query_threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+        install_timers()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            performance.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            performance.reset(token)
+        return self.finish(request, response)
+
+    def start(self, request):
+        request.performance = {
+            'queries': QueryTimer(request, self.slow_query_threshold),
+            'serialize': 0,
+            'serializing': False,
+            'renderer': 0,
+            'started': time.perf_counter(),
+            'view_started': None,
+        }
+        return performance.set(request.performance)
+
+    def finish(self, request, response):
+        finished = time.perf_counter()
+        timings = request.performance
+        timer = timings['queries']
+        started = timings['started']
+        view_started = timings['view_started'] or started
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timer.duration * 1000:.2f};desc="{timer.count} queries"',
+            f'serialize;dur={timings["serialize"] * 1000:.2f}',
+            f'renderer;dur={timings["renderer"] * 1000:.2f}',
+            f'view;dur={(finished - view_started) * 1000:.2f}',
+            f'total;dur={(finished - started) * 1000:.2f}',
+        ])
+
+        match = request.resolver_match
+        registry.observe(
+            (('method', request.method), ('route', match.route if match else '<unmatched>')),
+            quizwhiz_request_duration_seconds=finished - started,
+            quizwhiz_request_db_seconds=timer.duration,
+            quizwhiz_request_serializer_seconds=timings['serialize'],
+            quizwhiz_request_renderer_seconds=timings['renderer'],
+            quizwhiz_request_queries=timer.count,
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.performance['view_started'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        render_started = time.perf_counter()
+
+        def record_renderer(response):
+            request.performance['renderer'] += time.perf_counter() - render_started
+
+        response.add_post_render_callback(record_renderer)
+        return response
@@ -0,0 +1,76 @@
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Per-request routing state: None outside of requests, which always use the
+# primary. Otherwise a dict with `replica` (the view opted in to replica
+# reads) and `pinned` (the request wrote, or must read its own writes).
+routing = ContextVar('routing', default=None)
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+    return alias if alias in settings.DATABASES else None
+
+
+class ReplicaRouter:
+    """
+    Send reads of views marked with `use_read_replica = True` to the
+    `REPLICA_DATABASE_ALIAS` database. Unsafe requests and every query after
+    the first write of a request go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = routing.get()
+        if state is not None and state['replica'] and not state['pinned']:
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = routing.get()
+        if state is not None:
+            state['pinned'] = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            routing.reset(token)
+
+    async def __acall__(self, request):
+        # The state is a dict updated in place, so writes made by sync code in
+        # `sync_to_async` threads, which run in a copy of this context, still
+        # pin the rest of the request.
+        token = self.start(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            routing.reset(token)
+
+    def start(self, request):
+        return routing.set({
+            'replica': False,
+            'pinned': request.method not in ('GET', 'HEAD', 'OPTIONS'),
+        })
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        routing.get()['replica'] = getattr(view_class or view_func, 'use_read_replica', False)
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from datetime import timedelta
 from pathlib import Path
 
@@ -48,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'quizwhiz.middleware.PerformanceMiddleware',
+    'quizwhiz.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -88,9 +92,59 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction begins, so concurrent
+            # writers wait for it instead of failing with "database is locked".
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Keep connections open between requests, checking them before reuse.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replica for the views marked with `use_read_replica`. Point
+# QUIZWHIZ_REPLICA_DB at a second SQLite file, e.g. a copy of db.sqlite3, to
+# try it locally.
+REPLICA_DATABASE_ALIAS = 'replica'
+
+if os.environ.get('QUIZWHIZ_REPLICA_DB'):
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': os.environ['QUIZWHIZ_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['quizwhiz.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'quizwhiz',
+    },
+    # Responses kept for retries sent with an Idempotency-Key header. This
+    # cache is per process: with several worker processes a retry reaching
+    # another process runs again. Set QUIZWHIZ_IDEMPOTENCY_TABLE to share it
+    # through the database.
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'quizwhiz-idempotency',
+        'TIMEOUT': 24 * 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
 
+if os.environ.get('QUIZWHIZ_IDEMPOTENCY_TABLE'):
+    CACHES['idempotency'].update({
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ['QUIZWHIZ_IDEMPOTENCY_TABLE'],
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -135,10 +189,24 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 # Rest Framework Configuration
+# MessagePack is offered when the optional `msgpack` package is installed.
+MSGPACK_ENABLED = find_spec('msgpack') is not None
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'quiz.authentication.CachedJWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'quiz.renderers.ORJSONRenderer',
+        *(['quiz.renderers.MessagePackRenderer'] if MSGPACK_ENABLED else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'quiz.renderers.ORJSONParser',
+        *(['quiz.renderers.MessagePackParser'] if MSGPACK_ENABLED else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SIMPLE_JWT = {
@@ -148,3 +216,32 @@ SIMPLE_JWT = {
 
 # Custom Configuration
 AUTH_USER_MODEL = 'quiz.CustomUser'
+
+# Log queries slower than this many milliseconds on the quiz API routes.
+# None disables the slow query log.
+SLOW_QUERY_THRESHOLD_MS = None
+
+# Addresses allowed to scrape /metrics besides logged-in staff users. Behind a
+# proxy, REMOTE_ADDR is the proxy's address.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Seconds between the database reads that feed the live submission events.
+LIVE_EVENTS_POLL_INTERVAL = 2
+
+# Seconds between in-process sweeps that expire overdue submissions. None
+# disables the periodic sweep; run `manage.py expire_submissions` from cron instead.
+SUBMISSION_SWEEPER_INTERVAL = None
+
+# Write-behind answer journal. When set, submitted answers are acknowledged once
+# they are fsynced to this file and a background thread writes them to the
+# database in bulk every ANSWER_JOURNAL_FLUSH_INTERVAL seconds. The file must
+# not be shared between processes. None writes answers synchronously.
+ANSWER_JOURNAL_PATH = None
+ANSWER_JOURNAL_FLUSH_INTERVAL = 0.05
+
+# Seconds a grader holds the essay answers claimed from the review queue.
+REVIEW_LEASE_SECONDS = 300
+
+# In-process cache of the users loaded by CachedJWTAuthentication.
+AUTH_USER_CACHE_SIZE = 10000
+AUTH_USER_CACHE_TTL = 60
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from django.http import HttpResponse
 from django.contrib import admin
+from .metrics import metrics_view
 
 def home_view(request):
     return HttpResponse("ok")
@@ -8,5 +9,6 @@ def home_view(request):
 urlpatterns = [
     path('', home_view), 
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view),
     path('api/v1/', include('quiz.urls')),
 ]
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quizwhiz.settings')
 
 application = get_wsgi_application()
+
+from quiz.journal import get_journal  # noqa: E402
+from quiz.sweeper import start_periodic_sweeper  # noqa: E402
+
+# Replay the answer journal left by a crash before serving requests.
+get_journal()
+start_periodic_sweeper()
@@ -14,7 +14,8 @@ import { Link, useNavigate } from "react-router-dom";
 type Quiz = {
     id: string;
     title: string;
-    questions: { length: number }[];
+    question_count: number;
+    submission_count?: number;
 };
 
 type QuizSubmission = {
@@ -22,9 +23,21 @@ type QuizSubmission = {
     score: number;
 };
 
+type Page<T> = {
+    next: string | null;
+    results: T[];
+};
+
+type QuizzesResponse = {
+    created: Page<Quiz>;
+    participated: Page<QuizSubmission>;
+};
+
 type QuizzesState = {
     created: Quiz[];
     participated: QuizSubmission[];
+    createdNext: string | null;
+    participatedNext: string | null;
 };
 
 
@@ -34,22 +47,57 @@ export default function Dashboard() {
     const [quizzes, setQuizzes] = useState<QuizzesState>({
         created: [],
         participated: [],
+        createdNext: null,
+        participatedNext: null,
     });
 
-    const getQuizzes = async () => {
+    const fetchQuizzes = async (url: string): Promise<QuizzesResponse | undefined> => {
         try {
-            const response = await fetch(`${import.meta.env.VITE_API_KEY}/user/quizzes/`, {
+            const response = await fetch(url, {
                 headers: {
                     "Authorization": `Bearer ${token}`,
                 },
             });
-            const data: QuizzesState = await response.json();
-            setQuizzes(data);
+            return await response.json();
         } catch (error) {
             console.error("Error fetching quizzes:", error);
         }
     };
 
+    const getQuizzes = async () => {
+        const data = await fetchQuizzes(`${import.meta.env.VITE_API_KEY}/user/quizzes/`);
+        if (data) {
+            setQuizzes({
+                created: data.created.results,
+                participated: data.participated.results,
+                createdNext: data.created.next,
+                participatedNext: data.participated.next,
+            });
+        }
+    };
+
+    const loadMoreCreated = async () => {
+        const data = quizzes.createdNext && await fetchQuizzes(quizzes.createdNext);
+        if (data) {
+            setQuizzes((current) => ({
+                ...current,
+                created: [...current.created, ...data.created.results],
+                createdNext: data.created.next,
+            }));
+        }
+    };
+
+    const loadMoreParticipated = async () => {
+        const data = quizzes.participatedNext && await fetchQuizzes(quizzes.participatedNext);
+        if (data) {
+            setQuizzes((current) => ({
+                ...current,
+                participated: [...current.participated, ...data.participated.results],
+                participatedNext: data.participated.next,
+            }));
+        }
+    };
+
     useEffect(() => {
         getQuizzes();
     }, []);
@@ -84,8 +132,8 @@ export default function Dashboard() {
                                 quizzes.created?.map((quiz, index) => (
                                     <TableRow key={index}>
                                         <TableCell>{quiz.title}</TableCell>
-                                        <TableCell>{quiz.questions.length}</TableCell>
-                                        <TableCell>0</TableCell>
+                                        <TableCell>{quiz.question_count}</TableCell>
+                                        <TableCell>{quiz.submission_count}</TableCell>
                                         <TableCell>
                                             <Link
                                                 to={"/dashboard/quiz/" + quiz.id}
@@ -99,6 +147,9 @@ export default function Dashboard() {
                             )}
                     </TableBody>
                 </Table>
+                {quizzes.createdNext && (
+                    <Button variant="outline" className="mt-2" onClick={loadMoreCreated}>Load more</Button>
+                )}
             </div>
             <br />
             <div>
@@ -120,13 +171,16 @@ export default function Dashboard() {
                             (quizzes.participated?.map((submission, index) => (
                                 <TableRow key={index}>
                                     <TableCell>{submission.quiz.title}</TableCell>
-                                    <TableCell>{submission.quiz.questions.length}</TableCell>
+                                    <TableCell>{submission.quiz.question_count}</TableCell>
                                     <TableCell>{submission.score}</TableCell>
                                 </TableRow>
                             )))
                         }
                     </TableBody>
                 </Table>
+                {quizzes.participatedNext && (
+                    <Button variant="outline" className="mt-2" onClick={loadMoreParticipated}>Load more</Button>
+                )}
             </div>
         </div>
     );